@@ -2,6 +2,7 @@ from fastapi import APIRouter
 from starlette import status
 from backend.app.api.routes.user.user_router import router as user_router
 from backend.app.api.routes.books.bookes_router import router as book_router
+from backend.app.api.routes.metrics.metrics_router import router as metrics_router
 
 router = APIRouter()
 
@@ -17,3 +18,4 @@ async def ping() -> dict:
 
 router.include_router(user_router)
 router.include_router(book_router)
+router.include_router(metrics_router)
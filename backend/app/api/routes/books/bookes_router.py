@@ -1,52 +1,115 @@
-from typing import Union
+from typing import List, Optional, Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from pydantic import EmailStr
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import Session
 from starlette import status
+from starlette.requests import Request
 
 from backend.app.api.routes.books.books_helper import (
     _add_book,
+    _get_author_book_counts,
     _get_book,
+    _get_book_stats,
     _get_user_books,
+    _stream_user_books,
 )
+from backend.app.api.utils.conditional import conditional_response
+from backend.app.core.config import settings
 from backend.app.db.database import get_db
-from backend.app.models.books.book import BookIn
+from backend.app.db.unit_of_work import UnitOfWorkRoute
+from backend.app.models.books.book import AuthorBookCount, BookIn, BookStats
 
-router = APIRouter(prefix="/books", tags=["BOOKS"])
+router = APIRouter(prefix="/books", tags=["BOOKS"], route_class=UnitOfWorkRoute)
 
 
 @router.post("/add-book", status_code=status.HTTP_200_OK)
 async def add_book(
     book: BookIn,
     added_by: EmailStr,
+    request: Request,
     session: Union[AsyncSession, Session] = Depends(get_db),
 ):
     # """
     # route for adding a book
     # @return: BaseUser
     # """
-    return await _add_book(book=book, added_by=added_by, session=session)
+    return await _add_book(
+        book=book, added_by=added_by, session=session, request=request
+    )
 
 
 @router.get("/get-book", status_code=status.HTTP_200_OK)
 async def get_book(
-    book_name: str, session: Union[AsyncSession, Session] = Depends(get_db)
+    book_name: str,
+    request: Request,
+    session: Union[AsyncSession, Session] = Depends(get_db),
 ):
     # """
-    # route for getting a book data
+    # route for getting a book data, 304 when If-None-Match / If-Modified-Since still match
     # @return: Book
     # """
-    return await _get_book(book_name=book_name, session=session)
+    return conditional_response(
+        request,
+        await _get_book(book_name=book_name, session=session, request=request),
+    )
 
 
 @router.get("/get-user-books", status_code=status.HTTP_200_OK)
 async def get_user_books(
+    email: EmailStr,
+    request: Request,
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    cursor: Optional[str] = None,
+    session: Union[AsyncSession, Session] = Depends(get_db),
+):
+    # """
+    # route for getting a page of books owned by a user, pass next_cursor to get the next page
+    # @return: Page of Book, 304 when If-None-Match / If-Modified-Since still match
+    # """
+    return conditional_response(
+        request,
+        await _get_user_books(
+            email=email, limit=limit, cursor=cursor, session=session, request=request
+        ),
+    )
+
+
+@router.get("/stream-user-books", status_code=status.HTTP_200_OK)
+async def stream_user_books(
     email: EmailStr, session: Union[AsyncSession, Session] = Depends(get_db)
 ):
     # """
-    # route for getting all books owned by a user
-    # @return: list of Book
+    # route for streaming all books owned by a user as NDJSON, one book per line
+    # @return: StreamingResponse
+    # """
+    return await _stream_user_books(email=email, session=session)
+
+
+@router.get("/stats", status_code=status.HTTP_200_OK, response_model=BookStats)
+async def get_book_stats(
+    email: Optional[EmailStr] = None,
+    session: Union[AsyncSession, Session] = Depends(get_db),
+):
+    # """
+    # route for the book count, total and average price of a user, or of all books without email
+    # @return: BookStats
+    # """
+    return await _get_book_stats(email=email, session=session)
+
+
+@router.get(
+    "/author-counts",
+    status_code=status.HTTP_200_OK,
+    response_model=List[AuthorBookCount],
+)
+async def get_author_book_counts(
+    email: Optional[EmailStr] = None,
+    session: Union[AsyncSession, Session] = Depends(get_db),
+):
+    # """
+    # route for the number of books per author of a user, or of all books without email
+    # @return: list of AuthorBookCount
     # """
-    return await _get_user_books(email=email, session=session)
+    return await _get_author_book_counts(email=email, session=session)
@@ -1,49 +1,199 @@
-from typing import Union
+from functools import partial
+from typing import List, Optional, Union
 
 from fastapi import HTTPException
 from pydantic import EmailStr
+from sqlalchemy import func, literal_column
+from sqlalchemy.orm import raiseload
 from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.requests import Request
 
-from backend.app.db.database import get_from_db, update_db
-from backend.app.models.books.book import BookIn, Book
+from backend.app.api.utils.streaming import ndjson_response
+from backend.app.cache.read_through import cache_key, cached, invalidate
+from backend.app.core.config import settings
+from backend.app.db.database import (
+    aggregate_from_db,
+    get_from_db,
+    get_page_from_db,
+    insert_if_absent,
+    stream_from_db,
+)
+from backend.app.db.unit_of_work import after_commit
+from backend.app.models.books.book import (
+    AuthorBookCount,
+    Book,
+    BookAuthorStats,
+    BookIn,
+    BookStats,
+)
 from backend.app.models.users.user import User
 
+# every cached page of a user's books
+USER_BOOKS_TAG = "user_books:{email}"
+
 
 async def _add_book(
-    book: BookIn, added_by: EmailStr, session: Union[AsyncSession, Session]
+    book: BookIn,
+    added_by: EmailStr,
+    session: Union[AsyncSession, Session],
+    request: Request,
 ):
-    book_db = await get_from_db(
-        session=session, instance=Book, multiple=False, name=book.name
-    )
-    if book_db is not None:
-        raise HTTPException(status_code=400, detail=f"Book {book.name} already exists")
     added_user = await get_from_db(
-        session=session, instance=User, multiple=False, email=added_by
+        session=session,
+        instance=User,
+        multiple=False,
+        columns=[User.id],
+        email=added_by,
     )
     if added_user is None:
         raise HTTPException(status_code=400, detail=f"User {added_by} does not exist")
     new_book = Book(
         name=book.name, price=book.price, author=book.author, added_by=added_user.id
     )
-    book_db = await update_db(session, new_book, refresh_data=True)
+    book_db = await insert_if_absent(session, new_book, conflict_columns=["name"])
+    if book_db is None:
+        raise HTTPException(status_code=400, detail=f"Book {book.name} already exists")
+    await after_commit(
+        session,
+        partial(
+            invalidate,
+            request,
+            keys=[cache_key("book", book_name=book.name)],
+            tags=[USER_BOOKS_TAG.format(email=added_by)],
+        ),
+    )
     return book_db
 
 
-async def _get_book(book_name: str, session: Union[AsyncSession, Session]):
+@cached("book")
+async def _get_book(
+    book_name: str, session: Union[AsyncSession, Session], request: Request
+):
     book_db = await get_from_db(
-        session=session, instance=Book, multiple=False, name=book_name
+        session=session,
+        instance=Book,
+        multiple=False,
+        read_only=True,
+        options=[raiseload("*")],
+        name=book_name,
     )
     if book_db is None:
         raise HTTPException(status_code=404, detail=f"Book {book_name} does not exist")
     return book_db
 
 
-async def _get_user_books(email: EmailStr, session: Union[AsyncSession, Session]):
+@cached("user_books", tag=USER_BOOKS_TAG)
+async def _get_user_books(
+    email: EmailStr,
+    limit: int,
+    cursor: Optional[str],
+    session: Union[AsyncSession, Session],
+    request: Request,
+):
     user_db = await get_from_db(
-        session=session, instance=User, multiple=False, email=email
+        session=session,
+        instance=User,
+        multiple=False,
+        read_only=True,
+        columns=[User.id],
+        email=email,
     )
     if user_db is None:
         raise HTTPException(status_code=404, detail=f"User {email} does not exist")
-    # book_db = await get_from_db(session=session, instance=Book, multiple=True, added_by=user_db.id)
-    return user_db.books
+    try:
+        return await get_page_from_db(
+            session=session,
+            instance=Book,
+            limit=limit,
+            cursor=cursor,
+            read_only=True,
+            options=[raiseload("*")],
+            added_by=user_db.id,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def _stream_user_books(email: EmailStr, session: Union[AsyncSession, Session]):
+    user_db = await get_from_db(
+        session=session,
+        instance=User,
+        multiple=False,
+        read_only=True,
+        columns=[User.id],
+        email=email,
+    )
+    if user_db is None:
+        raise HTTPException(status_code=404, detail=f"User {email} does not exist")
+    return ndjson_response(
+        stream_from_db(
+            session=session,
+            instance=Book,
+            read_only=True,
+            options=[raiseload("*")],
+            added_by=user_db.id,
+        )
+    )
+
+
+def _stats_source(email: Optional[EmailStr]) -> dict:
+    """
+    Table and filters for the book aggregates, the summary table when enabled
+    @return: aggregate_from_db arguments
+    """
+    if settings.book_stats_from_summary:
+        source = dict(instance=BookAuthorStats)
+    else:
+        source = dict(instance=Book)
+    if email is not None:
+        source["joins"] = [(User, User.id == source["instance"].added_by)]
+        # a soft deleted user may share the email of the live one
+        source["where"] = [User.email == email, ~User.is_deleted]
+    return source
+
+
+async def _get_book_stats(
+    email: Optional[EmailStr], session: Union[AsyncSession, Session]
+) -> BookStats:
+    if settings.book_stats_from_summary:
+        book_count = func.sum(BookAuthorStats.book_count)
+        total_price = func.sum(BookAuthorStats.total_price)
+    else:
+        book_count = func.count(Book.id)
+        total_price = func.sum(Book.price)
+    ((count, total),) = await aggregate_from_db(
+        session=session,
+        aggregates=[func.coalesce(book_count, 0), func.coalesce(total_price, 0)],
+        read_only=True,
+        **_stats_source(email),
+    )
+    # SUM over the summary counts comes back as numeric
+    count, total = int(count), float(total)
+    return BookStats(
+        book_count=count,
+        total_price=total,
+        average_price=total / count if count else None,
+    )
+
+
+async def _get_author_book_counts(
+    email: Optional[EmailStr], session: Union[AsyncSession, Session]
+) -> List[AuthorBookCount]:
+    if settings.book_stats_from_summary:
+        author, book_count = BookAuthorStats.author, func.sum(
+            BookAuthorStats.book_count
+        )
+    else:
+        # books without an author are counted under '' as in the summary table, inlined
+        # so the select and the GROUP BY hold the same expression
+        author = func.coalesce(Book.author, literal_column("''"))
+        book_count = func.count(Book.id)
+    rows = await aggregate_from_db(
+        session=session,
+        aggregates=[book_count],
+        group_by=[author],
+        read_only=True,
+        **_stats_source(email),
+    )
+    return [AuthorBookCount(author=author, book_count=count) for author, count in rows]
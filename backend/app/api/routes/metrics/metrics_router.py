@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Request
+from starlette import status
+
+from backend.app.cache.instrumentation import namespace_cache_stats
+from backend.app.db.instrumentation import route_query_stats
+from backend.app.db.pool import pool_status
+
+router = APIRouter(prefix="/metrics", tags=["METRICS"])
+
+
+@router.get("/db", status_code=status.HTTP_200_OK)
+async def db_metrics() -> dict:
+    # """
+    # route for scraping the database statement aggregates of each route
+    # @return: statement counts and timings keyed by route
+    # """
+    return {
+        route: stats.as_dict() for route, stats in sorted(route_query_stats.items())
+    }
+
+
+@router.get("/db-pool", status_code=status.HTTP_200_OK)
+async def db_pool_metrics(request: Request) -> dict:
+    # """
+    # route for scraping the connection pool statistics of the primary and replica engines
+    # @return: pool size, checked out / overflow connections and checkout waits keyed by engine
+    # """
+    return pool_status([request.app.state.engine, *request.app.state.replica_engines])
+
+
+@router.get("/cache", status_code=status.HTTP_200_OK)
+async def cache_metrics(request: Request) -> dict:
+    # """
+    # route for scraping the hits and misses of the local (l1) and Redis (l2) cache tiers,
+    # and the traffic of each key namespace
+    # @return: hit / miss counts per tier, l1 is None when the local cache is disabled, and
+    # hits, misses, errors, Redis latency and payload size histograms per namespace
+    # """
+    local_cache = request.app.state.local_cache
+    return {
+        "l1": local_cache.status_dict() if local_cache is not None else None,
+        "l2": request.app.state.cache_stats.as_dict(),
+        "namespaces": {
+            namespace: stats.as_dict()
+            for namespace, stats in sorted(namespace_cache_stats.items())
+        },
+    }
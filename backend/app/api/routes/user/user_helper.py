@@ -1,12 +1,19 @@
+from functools import partial
 from typing import Union
 
 import bcrypt
 from fastapi import HTTPException
+from loguru import logger
+from sqlalchemy.orm import raiseload
 from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.requests import Request
 
+from backend.app.api.routes.books.books_helper import USER_BOOKS_TAG
+from backend.app.cache.read_through import invalidate
 from backend.app.core.config import settings
-from backend.app.db.database import get_from_db, update_db
+from backend.app.db.database import get_from_db, insert_if_absent
+from backend.app.db.unit_of_work import after_commit
 from backend.app.models.users.user import User, UserIn, UserLogin, BaseUser
 
 
@@ -30,12 +37,9 @@ def validate_password(plain_password: str, hashed_password: bytes) -> bool:
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password)
 
 
-async def _sign_up(user: UserIn, session: Union[Session, AsyncSession]):
-    used_db = await get_from_db(
-        session=session, instance=User, multiple=False, email=user.email
-    )
-    if used_db:
-        raise HTTPException(status_code=400, detail="User already exists")
+async def _sign_up(
+    user: UserIn, session: Union[Session, AsyncSession], request: Request
+):
     hashed_password = await hash_password(user.password)
     new_user = User(
         first_name=user.first_name,
@@ -44,14 +48,26 @@ async def _sign_up(user: UserIn, session: Union[Session, AsyncSession]):
         phone=user.phone,
         password_hash=hashed_password,
     )
-    print(f"new_user: {new_user}")
-    user_db = await update_db(session, new_user, refresh_data=True)
+    logger.debug("Signing up user {0}", new_user.email)
+    user_db = await insert_if_absent(session, new_user, conflict_columns=["email"])
+    if user_db is None:
+        raise HTTPException(status_code=400, detail="User already exists")
+    # drops pages cached for a deleted user of the same email
+    await after_commit(
+        session,
+        partial(invalidate, request, tags=[USER_BOOKS_TAG.format(email=user.email)]),
+    )
     return user_db
 
 
 async def _sign_in(user: UserLogin, session: Union[Session, AsyncSession]) -> BaseUser:
     user_db = await get_from_db(
-        session=session, instance=User, multiple=False, email=user.email
+        session=session,
+        instance=User,
+        multiple=False,
+        read_only=True,
+        options=[raiseload(User.books)],
+        email=user.email,
     )
     if not user_db:
         raise HTTPException(status_code=400, detail="User not found")
@@ -0,0 +1,45 @@
+from email.utils import parsedate_to_datetime
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from backend.app.cache.validators import Validators, content_validators
+
+
+def _not_modified(request: Request, validators: Validators) -> bool:
+    # If-Modified-Since is only evaluated without If-None-Match (RFC 7232)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = {
+            etag.strip()[2:] if etag.strip().startswith("W/") else etag.strip()
+            for etag in if_none_match.split(",")
+        }
+        return "*" in etags or validators.etag in etags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or validators.last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(validators.last_modified) <= parsedate_to_datetime(
+            if_modified_since
+        )
+    except (TypeError, ValueError):
+        return False
+
+
+def conditional_response(request: Request, content) -> Response:
+    """
+    Answer a GET with 304 Not Modified when the If-None-Match / If-Modified-Since validators
+    of the client still match `content`, without serializing it.
+    Uses the validators cached with the content by the read-through cache when present.
+    @return: 304 Response or JSONResponse of content, both carrying the validators
+    """
+    validators = getattr(request.state, "cache_validators", None)
+    if validators is None:
+        validators = content_validators(content)
+    # clients may keep the response but have to revalidate it on every use
+    headers = {"ETag": validators.etag, "Cache-Control": "no-cache"}
+    if validators.last_modified is not None:
+        headers["Last-Modified"] = validators.last_modified
+    if _not_modified(request, validators):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content, headers=headers)
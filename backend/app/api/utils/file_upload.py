@@ -1,5 +1,5 @@
 import os
-from typing import Union, List
+from typing import Iterator, Union, List
 
 import aiofiles
 import pandas as pd
@@ -10,6 +10,7 @@ from starlette import status
 from starlette.background import BackgroundTasks
 
 from backend.app.api.routes.user.helpers.user_helper import get_user_by_email
+from backend.app.db.bulk import copy_to_db
 from backend.app.db.database import update_db
 
 SUPPORTED_FILE_TYPES = [
@@ -26,10 +27,11 @@ SUPPORTED_FILE_TYPES = [
 CHUNK_SIZE = 1024 * 1024
 
 
-def df_to_sqlmodel(df: pd.DataFrame, instance) -> List[SQLModel]:
-    """Convert a pandas DataFrame into a list of SQLModel objects."""
-    objs = [instance(**row) for row in df.to_dict("records")]
-    return objs
+def df_to_sqlmodel(df: pd.DataFrame, instance, **overrides) -> Iterator[SQLModel]:
+    """Lazily convert the rows of a pandas DataFrame into SQLModel objects."""
+    columns = list(df.columns)
+    for values in df.itertuples(index=False, name=None):
+        yield instance(**dict(zip(columns, values)), **overrides)
 
 
 async def push_file_data_to_db(
@@ -57,15 +59,19 @@ async def push_file_data_to_db(
         for x in df.columns
     ]  # convert to snake case and remove spaces
     df = df.astype(object).where(pd.notnull(df), None)  # replace NaN with None
-    df_models = df_to_sqlmodel(df, instance)
+    overrides = {}
     #  check instance for created_by column
     if hasattr(instance, "created_by") and created_by is not None:
         user = await get_user_by_email(
             session, created_by, raise_exception_on_not_found=True
         )
-        for model in df_models:
-            model.created_by = user.id
-    background_task.add_task(update_db, session, df_models)
+        overrides["created_by"] = user.id
+    df_models = df_to_sqlmodel(df, instance, **overrides)
+    if isinstance(session, AsyncSession):
+        #  stream the rows to the table with COPY instead of ORM inserts
+        background_task.add_task(copy_to_db, session, instance, df_models)
+    else:
+        background_task.add_task(update_db, session, list(df_models))
     return {
         "detail": "Validation passed, pushing data to DB in background and will be available in a few minutes"
     }
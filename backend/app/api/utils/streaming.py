@@ -0,0 +1,28 @@
+import json
+from typing import AsyncIterator
+
+from pydantic import BaseModel
+from pydantic.json import pydantic_encoder
+from starlette.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _to_json(item) -> str:
+    if isinstance(item, BaseModel):
+        return item.json()
+    # row of a column projection
+    return json.dumps(dict(item._mapping), default=pydantic_encoder)
+
+
+async def _ndjson_lines(batches: AsyncIterator[list]) -> AsyncIterator[str]:
+    async for batch in batches:
+        yield "".join(f"{_to_json(item)}\n" for item in batch)
+
+
+def ndjson_response(batches: AsyncIterator[list]) -> StreamingResponse:
+    """
+    Stream the batches of stream_from_db as newline delimited JSON, one object per line
+    @return: StreamingResponse
+    """
+    return StreamingResponse(_ndjson_lines(batches), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,289 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from typing import (
+    AsyncContextManager,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import aioredis
+
+# (command, *arguments) run by CacheBackend.pipeline
+Command = Tuple
+
+# deletes a key only while it still holds the given value
+_DELETE_IF_EQUALS_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _to_bytes(value: Union[str, bytes]) -> bytes:
+    return value.encode() if isinstance(value, str) else value
+
+
+class Subscription(ABC):
+    @abstractmethod
+    async def get_message(self, timeout: float) -> Optional[bytes]:
+        """
+        @return: the next message published on the channel, None after `timeout` seconds
+        """
+
+
+class CacheBackend(ABC):
+    """
+    Commands RedisCache runs against its store, with Redis semantics: values and set
+    members come back as bytes, expiries are in seconds (ex) or milliseconds (px)
+    """
+
+    @abstractmethod
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        ...
+
+    @abstractmethod
+    async def set(
+        self,
+        key: str,
+        value: Union[str, bytes],
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+    ) -> Optional[bool]:
+        """
+        @return: True, None when `nx` is set and the key exists
+        """
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> int:
+        ...
+
+    @abstractmethod
+    async def delete_if_equals(self, key: str, value: Union[str, bytes]) -> int:
+        ...
+
+    @abstractmethod
+    async def exists(self, *keys: str) -> int:
+        ...
+
+    @abstractmethod
+    async def sadd(self, key: str, *members: str) -> int:
+        ...
+
+    @abstractmethod
+    async def smembers(self, key: str) -> Set[bytes]:
+        ...
+
+    @abstractmethod
+    async def expire(self, key: str, seconds: int) -> bool:
+        ...
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Union[str, bytes]) -> int:
+        ...
+
+    @abstractmethod
+    async def pipeline(self, commands: Sequence[Command]) -> list:
+        """
+        Run `commands` in a single round trip
+        @return: the result of each command
+        """
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> AsyncContextManager[Subscription]:
+        """
+        Async context manager subscribed to `channel` while it is open
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+
+class _RedisSubscription(Subscription):
+    def __init__(self, pubsub: aioredis.client.PubSub) -> None:
+        self.pubsub = pubsub
+
+    async def get_message(self, timeout: float) -> Optional[bytes]:
+        message = await self.pubsub.get_message(
+            ignore_subscribe_messages=True, timeout=timeout
+        )
+        return message["data"] if message is not None else None
+
+
+class RedisBackend(CacheBackend):
+    def __init__(self, redis: aioredis.Redis) -> None:
+        self.redis = redis
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        return await self.redis.mget(keys)
+
+    async def set(self, key, value, ex=None, px=None, nx=False) -> Optional[bool]:
+        return await self.redis.set(key, value, ex=ex, px=px, nx=nx)
+
+    async def delete(self, *keys: str) -> int:
+        return await self.redis.delete(*keys)
+
+    async def delete_if_equals(self, key: str, value: Union[str, bytes]) -> int:
+        return await self.redis.eval(_DELETE_IF_EQUALS_SCRIPT, 1, key, value)
+
+    async def exists(self, *keys: str) -> int:
+        return await self.redis.exists(*keys)
+
+    async def sadd(self, key: str, *members: str) -> int:
+        return await self.redis.sadd(key, *members)
+
+    async def smembers(self, key: str) -> Set[bytes]:
+        return await self.redis.smembers(key)
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        return await self.redis.expire(key, seconds)
+
+    async def publish(self, channel: str, message: Union[str, bytes]) -> int:
+        return await self.redis.publish(channel, message)
+
+    async def pipeline(self, commands: Sequence[Command]) -> list:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for command, *args in commands:
+                getattr(pipe, command)(*args)
+            return await pipe.execute()
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            yield _RedisSubscription(pubsub)
+        finally:
+            await pubsub.reset()
+
+    async def close(self) -> None:
+        await self.redis.close()
+        await self.redis.connection_pool.disconnect()
+
+
+class _MemorySubscription(Subscription):
+    def __init__(self) -> None:
+        self.messages: "asyncio.Queue[bytes]" = asyncio.Queue()
+
+    async def get_message(self, timeout: float) -> Optional[bytes]:
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process stand-in for Redis: strings and sets with expiries, evicting the least
+    recently used key beyond `max_keys`, and pub/sub between the subscribers of the process.
+    Expired keys are dropped when they are next accessed or evicted.
+    It is not shared between processes, so use it for tests, benchmarks and single worker
+    deployments.
+    """
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        # key -> (value or set of members, expires at or None), least recently used first
+        self._data: OrderedDict = OrderedDict()
+        self._subscriptions: Dict[str, Set[_MemorySubscription]] = defaultdict(set)
+
+    def _get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _put(self, key: str, value, expires_at: Optional[float]) -> None:
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_keys:
+            self._data.popitem(last=False)
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        values = [self._get(key) for key in keys]
+        return [value if isinstance(value, bytes) else None for value in values]
+
+    async def set(self, key, value, ex=None, px=None, nx=False) -> Optional[bool]:
+        if nx and self._get(key) is not None:
+            return None
+        expires_at = None
+        if ex is not None:
+            expires_at = time.monotonic() + ex
+        elif px is not None:
+            expires_at = time.monotonic() + px / 1000
+        self._put(key, _to_bytes(value), expires_at)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            if self._get(key) is not None:
+                del self._data[key]
+                deleted += 1
+        return deleted
+
+    async def delete_if_equals(self, key: str, value: Union[str, bytes]) -> int:
+        if self._get(key) == _to_bytes(value):
+            del self._data[key]
+            return 1
+        return 0
+
+    async def exists(self, *keys: str) -> int:
+        return sum(self._get(key) is not None for key in keys)
+
+    async def sadd(self, key: str, *members: str) -> int:
+        current = self._get(key)
+        if not isinstance(current, set):
+            current = set()
+            self._put(key, current, None)
+        added = {_to_bytes(member) for member in members} - current
+        current.update(added)
+        return len(added)
+
+    async def smembers(self, key: str) -> Set[bytes]:
+        value = self._get(key)
+        return set(value) if isinstance(value, set) else set()
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        value = self._get(key)
+        if value is None:
+            return False
+        self._data[key] = (value, time.monotonic() + seconds)
+        return True
+
+    async def publish(self, channel: str, message: Union[str, bytes]) -> int:
+        subscriptions = self._subscriptions.get(channel, ())
+        for subscription in subscriptions:
+            subscription.messages.put_nowait(_to_bytes(message))
+        return len(subscriptions)
+
+    async def pipeline(self, commands: Sequence[Command]) -> list:
+        return [await getattr(self, command)(*args) for command, *args in commands]
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        subscription = _MemorySubscription()
+        self._subscriptions[channel].add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscriptions[channel].discard(subscription)
+
+    async def close(self) -> None:
+        self._data.clear()
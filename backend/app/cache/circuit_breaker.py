@@ -0,0 +1,59 @@
+import time
+from typing import Optional
+
+from loguru import logger
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for `reset_seconds`.
+    After that a single trial call is let through per `reset_seconds` (half-open), the first
+    success closes the breaker again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """
+        @return: whether a call may go through
+        """
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at < self.reset_seconds:
+            return False
+        # trial call, the others keep being rejected until it succeeds
+        self._opened_at = now
+        return True
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("Circuit breaker {0} closed", self.name)
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._opened_at is not None:
+            self._opened_at = time.monotonic()
+        elif self._failures >= self.failure_threshold:
+            logger.warning(
+                "Circuit breaker {0} opened after {1} failures for {2}s",
+                self.name,
+                self._failures,
+                self.reset_seconds,
+            )
+            self._opened_at = time.monotonic()
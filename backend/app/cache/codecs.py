@@ -0,0 +1,149 @@
+import json
+import zlib
+from datetime import date, datetime
+from functools import partial
+from json import JSONEncoder
+from typing import Any, Callable, Dict, Tuple
+
+# (id, factory) of each serializer and compressor, a factory imports what it needs and
+# returns the (encode, decode) pair. Ids are part of stored values and must never change.
+_Pair = Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]
+
+
+class DateTimeEncoder(JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, (date, datetime)):
+            return obj.isoformat()
+        return super().default(obj)
+
+
+def _isoformat(obj):
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def _json() -> _Pair:
+    def dumps(value) -> bytes:
+        return json.dumps(value, separators=(",", ":"), cls=DateTimeEncoder).encode()
+
+    return dumps, json.loads
+
+
+def _orjson() -> _Pair:
+    import orjson
+
+    return partial(orjson.dumps, default=_isoformat), orjson.loads
+
+
+def _msgpack() -> _Pair:
+    import msgpack
+
+    return (
+        partial(msgpack.packb, default=_isoformat),
+        partial(msgpack.unpackb, raw=False),
+    )
+
+
+def _zlib() -> _Pair:
+    return zlib.compress, zlib.decompress
+
+
+def _zstd() -> _Pair:
+    import zstandard
+
+    return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+
+
+def _lz4() -> _Pair:
+    import lz4.frame
+
+    return lz4.frame.compress, lz4.frame.decompress
+
+
+SERIALIZERS: Dict[str, Tuple[int, Callable[[], _Pair]]] = {
+    "json": (1, _json),
+    "orjson": (2, _orjson),
+    "msgpack": (3, _msgpack),
+}
+COMPRESSORS: Dict[str, Tuple[int, Callable[[], _Pair]]] = {
+    "zlib": (1, _zlib),
+    "zstd": (2, _zstd),
+    "lz4": (3, _lz4),
+}
+_SERIALIZER_IDS = {id_: factory for id_, factory in SERIALIZERS.values()}
+_COMPRESSOR_IDS = {id_: factory for id_, factory in COMPRESSORS.values()}
+
+
+class CacheCodec:
+    """
+    Encodes cache values with a serializer, compressing the payload with `compression` when
+    it is at least `compression_threshold` bytes. The first byte of a value records the
+    serializer (high nibble) and compressor (low nibble, 0 for none) it was written with,
+    so values written with another codec stay readable and the codec can change without
+    flushing the cache.
+    Raises ImportError when the package of the serializer or compressor is not installed,
+    they come with the cache extra
+    """
+
+    def __init__(
+        self, serializer: str, compression: str = None, compression_threshold: int = 0
+    ):
+        serializer_id, factory = SERIALIZERS[serializer]
+        self._dumps, _ = self._load(factory, serializer)
+        self._compress = None
+        compressor_id = 0
+        if compression is not None:
+            compressor_id, factory = COMPRESSORS[compression]
+            self._compress, _ = self._load(factory, compression)
+        self.compression_threshold = compression_threshold
+        self._header = serializer_id << 4
+        self._compressed_header = self._header | compressor_id
+        # decoders by id, imported on the first value needing them
+        self._serializers: Dict[int, _Pair] = {}
+        self._compressors: Dict[int, _Pair] = {}
+
+    def encode(self, value) -> bytes:
+        payload = self._dumps(value)
+        if self._compress is not None and len(payload) >= self.compression_threshold:
+            return bytes((self._compressed_header,)) + self._compress(payload)
+        return bytes((self._header,)) + payload
+
+    def decode(self, data: bytes):
+        """
+        Raises ValueError for a value no known codec wrote, e.g. before the header existed
+        """
+        if not data:
+            raise ValueError("Empty cache value")
+        serializer_id, compressor_id = data[0] >> 4, data[0] & 0x0F
+        decompress = None
+        if compressor_id:
+            decompress = self._decoder(
+                self._compressors, _COMPRESSOR_IDS, compressor_id
+            )
+        loads = self._decoder(self._serializers, _SERIALIZER_IDS, serializer_id)
+        try:
+            payload = data[1:] if decompress is None else decompress(data[1:])
+            return loads(payload)
+        except Exception as e:
+            raise ValueError(f"Undecodable cache value: {e!r}") from e
+
+    @staticmethod
+    def _load(factory: Callable[[], _Pair], name: str) -> _Pair:
+        try:
+            return factory()
+        except ImportError as e:
+            raise ImportError(
+                f"Cache codec {name} is not installed, install the cache extra"
+            ) from e
+
+    @staticmethod
+    def _decoder(loaded: Dict[int, _Pair], factories: dict, id_: int):
+        if id_ not in loaded:
+            if id_ not in factories:
+                raise ValueError(f"Unknown cache codec id {id_}")
+            try:
+                loaded[id_] = factories[id_]()
+            except ImportError as e:
+                raise ValueError(f"Cache codec id {id_} is not installed") from e
+        return loaded[id_][1]
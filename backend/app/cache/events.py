@@ -1,23 +1,76 @@
+import asyncio
+
 import aioredis
 from fastapi import FastAPI
 from loguru import logger
 
+from backend.app.cache.backends import CacheBackend, MemoryBackend, RedisBackend
+from backend.app.cache.circuit_breaker import CircuitBreaker
+from backend.app.cache.codecs import CacheCodec
+from backend.app.cache.invalidation import InvalidationListener
+from backend.app.cache.local import CacheStats, LocalCache
 from backend.app.core.settings.app import AppSettings
 
 
-async def connect_to_cache(app: FastAPI, settings: AppSettings):
+def _redis_backend(settings: AppSettings) -> CacheBackend:
     redis_url: str = f"redis://{settings.redis_host}:{settings.redis_port}"
     logger.info("Connecting to Redis Cache {0}", repr(redis_url))
-    async with aioredis.from_url(
-        redis_url, encoding="utf8", decode_responses=True
-    ) as pool:
-        app.state.cache = aioredis.Redis(connection_pool=pool).connection_pool
-    logger.info("Redis Cache Connection established")
+    timeout = settings.redis_timeout_ms / 1000
+    # bounded pool, waiting at most `timeout` for a free connection.
+    # Responses stay bytes, values are encoded by the cache codec
+    pool = aioredis.BlockingConnectionPool.from_url(
+        redis_url,
+        max_connections=settings.redis_max_connections,
+        timeout=timeout,
+        socket_timeout=timeout,
+        socket_connect_timeout=timeout,
+        health_check_interval=settings.redis_health_check_interval,
+    )
+    return RedisBackend(aioredis.Redis(connection_pool=pool))
+
+
+async def connect_to_cache(app: FastAPI, settings: AppSettings):
+    if settings.cache_backend == "memory":
+        logger.info("Using the in-memory cache backend")
+        app.state.cache = MemoryBackend(max_keys=settings.cache_memory_max_keys)
+    else:
+        app.state.cache = _redis_backend(settings)
+    app.state.cache_breaker = CircuitBreaker(
+        "redis",
+        failure_threshold=settings.redis_breaker_failure_threshold,
+        reset_seconds=settings.redis_breaker_reset_seconds,
+    )
+    app.state.cache_codec = CacheCodec(
+        settings.cache_codec,
+        compression=settings.cache_compression,
+        compression_threshold=settings.cache_compression_threshold,
+    )
+    app.state.cache_stats = CacheStats()
+    app.state.local_cache = None
+    app.state.cache_listener_task = None
+    if settings.cache_local:
+        app.state.local_cache = LocalCache(
+            max_entries=settings.cache_local_max_entries,
+            max_bytes=settings.cache_local_max_bytes,
+            ttl=settings.cache_local_ttl,
+        )
+        listener = InvalidationListener(
+            app.state.cache,
+            app.state.local_cache,
+            channel=settings.cache_invalidation_channel,
+            retry_seconds=settings.cache_invalidation_retry_seconds,
+        )
+        app.state.cache_listener_task = asyncio.create_task(listener.run())
+    logger.info("Cache Connection established")
 
 
 async def close_cache_connection(app: FastAPI):
-    logger.info("Closing connection to Redis Cache")
+    logger.info("Closing connection to Cache")
+
+    if app.state.cache_listener_task is not None:
+        app.state.cache_listener_task.cancel()
+        await asyncio.gather(app.state.cache_listener_task, return_exceptions=True)
 
     await app.state.cache.close()
 
-    logger.info("Connection to Redis Cache closed")
+    logger.info("Connection to Cache closed")
@@ -0,0 +1,147 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# upper bounds of the histogram buckets, the last bucket takes everything above
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100)
+PAYLOAD_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+@dataclass
+class Histogram:
+    bounds: Tuple[float, ...]
+    counts: List[int] = field(init=False)
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self) -> dict:
+        buckets = {
+            f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)
+        }
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0.0,
+            "max": round(self.max, 3),
+            "buckets": buckets,
+        }
+
+
+@dataclass
+class NamespaceCacheStats:
+    """
+    Cache traffic of the keys sharing a namespace, the key prefix before the first colon
+    """
+
+    l1_hits: int = 0
+    l2_hits: int = 0
+    misses: int = 0
+    errors: int = 0
+    skipped: int = 0
+    latency_ms: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS_MS))
+    payload_bytes: Histogram = field(
+        default_factory=lambda: Histogram(PAYLOAD_BUCKETS_BYTES)
+    )
+
+    def as_dict(self) -> dict:
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        hits = self.l1_hits + self.l2_hits
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "redis_latency_ms": self.latency_ms.as_dict(),
+            "payload_bytes": self.payload_bytes.as_dict(),
+        }
+
+
+@dataclass
+class RequestCacheStats:
+    """
+    Cache lookups and Redis calls made while handling one request
+    """
+
+    hits: int = 0
+    misses: int = 0
+    calls: int = 0
+    duration: float = 0.0
+
+    def server_timing(self) -> str:
+        return (
+            f"cache;dur={self.duration * 1000:.2f};"
+            f'desc="{self.hits} hits, {self.misses} misses"'
+        )
+
+
+request_cache_stats: ContextVar[Optional[RequestCacheStats]] = ContextVar(
+    "request_cache_stats", default=None
+)
+namespace_cache_stats: Dict[str, NamespaceCacheStats] = {}
+
+
+def key_namespace(key) -> str:
+    if isinstance(key, bytes):
+        key = key.decode()
+    return key.split(":", 1)[0]
+
+
+def _namespace_stats(key) -> NamespaceCacheStats:
+    namespace = key_namespace(key)
+    stats = namespace_cache_stats.get(namespace)
+    if stats is None:
+        stats = namespace_cache_stats[namespace] = NamespaceCacheStats()
+    return stats
+
+
+def record_lookup(key, tier: Optional[str]) -> None:
+    """
+    Record a lookup of `key`, `tier` is "l1" or "l2" for a hit and None for a miss
+    """
+    stats = _namespace_stats(key)
+    request_stats = request_cache_stats.get()
+    if tier is None:
+        stats.misses += 1
+    elif tier == "l1":
+        stats.l1_hits += 1
+    else:
+        stats.l2_hits += 1
+    if request_stats is not None:
+        request_stats.hits += tier is not None
+        request_stats.misses += tier is None
+
+
+def record_call(keys: Iterable, duration: float, error: bool = False) -> None:
+    """
+    Record a Redis call on `keys`, counted once per namespace
+    """
+    request_stats = request_cache_stats.get()
+    if request_stats is not None:
+        request_stats.calls += 1
+        request_stats.duration += duration
+    for namespace in {key_namespace(key) for key in keys}:
+        stats = _namespace_stats(namespace)
+        stats.latency_ms.observe(duration * 1000)
+        stats.errors += error
+
+
+def record_skipped(keys: Iterable) -> None:
+    for namespace in {key_namespace(key) for key in keys}:
+        _namespace_stats(namespace).skipped += 1
+
+
+def record_payload(key, size: int) -> None:
+    _namespace_stats(key).payload_bytes.observe(size)
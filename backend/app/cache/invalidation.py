@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from loguru import logger
+
+from backend.app.cache.backends import CacheBackend
+from backend.app.cache.local import LocalCache
+
+
+def invalidation_message(keys) -> str:
+    return json.dumps(list(keys), separators=(",", ":"))
+
+
+class InvalidationListener:
+    """
+    Keeps the LocalCache of a worker coherent with the other workers and nodes: evicts the
+    keys published on `channel` by RedisCache deletes. The local cache is cleared whenever
+    the subscription is (re)established, since messages may have been missed meanwhile.
+    """
+
+    def __init__(
+        self,
+        cache: CacheBackend,
+        local_cache: LocalCache,
+        channel: str,
+        retry_seconds: float,
+    ) -> None:
+        self.cache = cache
+        self.local_cache = local_cache
+        self.channel = channel
+        self.retry_seconds = retry_seconds
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Cache invalidation channel {0} lost, retrying in {1}s: {2!r}",
+                    self.channel,
+                    self.retry_seconds,
+                    e,
+                )
+            self.local_cache.clear()
+            await asyncio.sleep(self.retry_seconds)
+
+    async def _listen(self) -> None:
+        async with self.cache.subscribe(self.channel) as subscription:
+            self.local_cache.clear()
+            while True:
+                message = await subscription.get_message(timeout=1.0)
+                if message is not None:
+                    self.local_cache.delete(json.loads(message))
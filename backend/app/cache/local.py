@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Tuple
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class LocalCache:
+    """
+    In-process LRU cache of decoded values, bounded by `max_entries` and by `max_bytes` of
+    encoded size, whose entries expire after `ttl` seconds.
+    Values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.size = 0
+        # key -> (expires at, encoded size, value), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            self.delete([key])
+            entry = None
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[2]
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        self.delete([key])
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self.size += size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def delete(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def status_dict(self) -> dict:
+        return {
+            **self.stats.as_dict(),
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
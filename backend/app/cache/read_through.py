@@ -0,0 +1,165 @@
+import asyncio
+import functools
+import inspect
+import json
+import time
+from typing import Awaitable, Callable, Optional, Sequence
+from uuid import uuid4
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+
+from backend.app.cache.redis import redis_cache
+from backend.app.cache.stampede import SingleFlight, refresh_early
+from backend.app.cache.validators import Validators, content_validators
+from backend.app.core.config import get_app_settings
+
+# arguments of a cached helper that are not part of its cache key
+_UNKEYED_ARGUMENTS = ("session", "request")
+
+_single_flight = SingleFlight()
+
+
+def cache_key(namespace: str, **arguments) -> str:
+    """
+    @return: Redis key of the helper call cached under `namespace` with these arguments
+    """
+    return f"{namespace}:" + json.dumps(
+        arguments, sort_keys=True, separators=(",", ":"), default=str
+    )
+
+
+def cached(namespace: str, tag: Optional[str] = None) -> Callable:
+    """
+    Read-through cache for a route helper taking `request` and `session` arguments. Results
+    are stored JSON encoded under cache_key(namespace, **other arguments) for
+    redis_key_expiry seconds, so the helper returns JSON compatible data on hits and misses.
+    `tag` is a format string over the arguments naming a group of keys which a write path
+    drops at once with invalidate, e.g. every page of a listing.
+    Client errors, e.g. 404s, are cached for cache_error_expiry seconds and raised again
+    on hits, other exceptions are not cached.
+    The HTTP validators of a result are cached with it and left in request.state for
+    conditional_response.
+    Stampedes on a key are avoided: concurrent misses of a worker share one helper call,
+    across nodes a short Redis lock lets one caller load while the others wait for its
+    value, and hot keys are refreshed by a single caller ahead of their expiry (XFetch).
+    """
+
+    def decorator(helper: Callable) -> Callable:
+        signature = inspect.signature(helper)
+
+        @functools.wraps(helper)
+        async def read_through(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            request = bound.arguments["request"]
+            arguments = {
+                name: value
+                for name, value in bound.arguments.items()
+                if name not in _UNKEYED_ARGUMENTS
+            }
+            key = cache_key(namespace, **arguments)
+            key_tag = tag.format(**arguments) if tag is not None else None
+            settings = get_app_settings()
+
+            async def load() -> list:
+                started = time.monotonic()
+                try:
+                    value = jsonable_encoder(await helper(*args, **kwargs))
+                except HTTPException as e:
+                    if e.status_code < 500:
+                        await redis_cache.set(
+                            key,
+                            [e.status_code, e.detail],
+                            request,
+                            tag=key_tag,
+                            expiry=settings.cache_error_expiry,
+                        )
+                    raise
+                # stored with the time it took and its expiry for the early refresh,
+                # and with its validators
+                entry = [
+                    value,
+                    time.monotonic() - started,
+                    time.time() + settings.redis_key_expiry,
+                    *content_validators(value),
+                ]
+                await redis_cache.set(key, entry, request, tag=key_tag)
+                return entry
+
+            entry = _cache_entry(await redis_cache.get(key, request))
+            if entry is None:
+                entry = await _single_flight.run(
+                    key, functools.partial(_load_once, key, load, request)
+                )
+            elif (
+                len(entry) == 5
+                and not _single_flight.in_flight(key)
+                and refresh_early(entry[1], entry[2], settings.cache_xfetch_beta)
+            ):
+                entry = await _single_flight.run(
+                    key, functools.partial(_load_once, key, load, request, entry)
+                )
+            if len(entry) == 2:
+                raise HTTPException(*entry)
+            request.state.cache_validators = Validators(*entry[3:])
+            return entry[0]
+
+        return read_through
+
+    return decorator
+
+
+def _cache_entry(entry) -> Optional[list]:
+    """
+    @return: [value, load time, expiry, etag, last modified] entry, [status code, detail]
+    of a client error, None for a miss
+    """
+    # values cached before entries carried their timings and validators count as misses
+    if isinstance(entry, list) and len(entry) in (2, 5):
+        return entry
+    return None
+
+
+async def _load_once(
+    key: str, load: Callable[[], Awaitable], request: Request, current=None
+) -> list:
+    """
+    Load the entry of `key` on a single caller across nodes, holding a short Redis lock.
+    Without the lock the `current` entry of an early refresh is kept, a miss waits up to
+    cache_lock_wait_ms for the entry of the lock holder. It loads the entry itself after
+    that, or as soon as the lock is released without an entry, e.g. when the load failed.
+    """
+    settings = get_app_settings()
+    lock_key = f"lock:{key}"
+    token = uuid4().hex
+    if await redis_cache.lock(lock_key, token, settings.cache_lock_ttl_ms, request):
+        try:
+            return await load()
+        finally:
+            await redis_cache.unlock(lock_key, token, request)
+    if current is not None:
+        return current
+    deadline = time.monotonic() + settings.cache_lock_wait_ms / 1000
+    while time.monotonic() < deadline:
+        await asyncio.sleep(settings.cache_lock_poll_ms / 1000)
+        # checked first, the holder stores its entry before releasing the lock
+        locked = await redis_cache.locked(lock_key, request)
+        entry = _cache_entry(await redis_cache.get(key, request))
+        if entry is not None:
+            return entry
+        if not locked:
+            break
+    return await load()
+
+
+async def invalidate(
+    request: Request, keys: Sequence[str] = (), tags: Sequence[str] = ()
+) -> None:
+    """
+    Drop cached helper results, by key and by tag
+    """
+    await redis_cache.delete_many(keys, request)
+    for tag in tags:
+        await redis_cache.invalidate_tag(tag, request)
@@ -1,48 +1,227 @@
-import json
-from datetime import date, datetime
-from json import JSONEncoder
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
 
-from fastapi import HTTPException
-from starlette import status
+from aioredis import RedisError
+from loguru import logger
 from starlette.requests import Request
 
+from backend.app.cache.backends import Command
+from backend.app.cache.instrumentation import (
+    record_call,
+    record_lookup,
+    record_payload,
+    record_skipped,
+)
+from backend.app.cache.invalidation import invalidation_message
 from backend.app.core.config import get_app_settings
 
 
-class DateTimeEncoder(JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (date, datetime)):
-            return obj.isoformat()
+async def _guarded(
+    request: Request, keys: Sequence, name: str, call: Callable[[], Awaitable]
+):
+    """
+    Run a Redis call on `keys`, failing open: when Redis is down, slow or the circuit
+    breaker is open the call is skipped, so the caller falls through to the database.
+    The call is recorded in the cache stats of the namespaces of `keys`.
+    @return: the call result, None if it was skipped or failed
+    """
+    breaker = request.app.state.cache_breaker
+    if not breaker.allow():
+        record_skipped(keys)
+        return None
+    started = time.perf_counter()
+    try:
+        # bounded by the socket and pool timeouts of the client, which disconnect the
+        # connection. Cancelling the call instead would put it back in the pool with
+        # its reply unread, to be read by the next command on that connection
+        result = await call()
+    except (RedisError, OSError) as e:
+        record_call(keys, time.perf_counter() - started, error=True)
+        breaker.record_failure()
+        logger.warning("Redis {0} failed, skipping cache: {1!r}", name, e)
+        return None
+    record_call(keys, time.perf_counter() - started)
+    breaker.record_success()
+    return result
+
+
+async def _execute(request: Request, keys: Sequence, command: str, *args, **kwargs):
+    return await _guarded(
+        request,
+        keys,
+        command,
+        lambda: getattr(request.app.state.cache, command)(*args, **kwargs),
+    )
+
+
+async def _pipeline(
+    request: Request, keys: Sequence, commands: Sequence[Command]
+) -> Optional[list]:
+    """
+    Send `commands` in a single round trip
+    @return: the result of each command, None if the pipeline was skipped or failed
+    """
+    return await _execute(request, keys, "pipeline", commands)
 
 
 class RedisCache:
+    """
+    Cache over the CacheBackend selected by cache_backend, Redis or in-memory, fronted by
+    the LocalCache of the worker, when enabled.
+    Values expire after redis_key_expiry seconds, deletes are published so every worker
+    evicts the keys from its local cache.
+    """
+
+    @staticmethod
+    async def set(key, value, request: Request, tag=None, expiry: Optional[int] = None):
+        """
+        Store `value`, adding `key` to the set of keys of `tag` in the same round trip
+        """
+        await RedisCache.set_many({key: value}, request, tag=tag, expiry=expiry)
+
     @staticmethod
-    async def set(key, value, request: Request):
+    async def set_many(
+        values: Dict[str, object],
+        request: Request,
+        tag=None,
+        expiry: Optional[int] = None,
+    ):
+        """
+        Store several values in one round trip, all added to `tag` if given.
+        Values expire after `expiry` seconds, redis_key_expiry by default, a tag lives at
+        least as long as the keys it holds.
+        """
+        if not values:
+            return
         settings = get_app_settings()
-        data = json.dumps(value, indent=4, sort_keys=False, cls=DateTimeEncoder)
-        try:
-            await request.app.state.cache.set(key, data)
-            await request.app.state.cache.expire(
-                name=key, time=settings.redis_key_expiry
-            )
-        except ConnectionError:
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail="Redis connectivity failed",
-            )
+        expiry = expiry or settings.redis_key_expiry
+        codec = request.app.state.cache_codec
+        local_cache = request.app.state.local_cache
+        commands = []
+        for key, value in values.items():
+            data = codec.encode(value)
+            record_payload(key, len(data))
+            if local_cache is not None:
+                local_cache.set(key, value, len(data))
+            # SET with EX, the value never exists without its expiry
+            commands.append(("set", key, data, expiry))
+        if tag is not None:
+            commands.append(("sadd", tag, *values))
+            commands.append(("expire", tag, max(expiry, settings.redis_key_expiry)))
+        if len(commands) == 1:
+            await _execute(request, list(values), *commands[0])
+        else:
+            await _pipeline(request, list(values), commands)
 
     @staticmethod
     async def get(key, request: Request):
-        try:
-            data = await request.app.state.cache.get(key)
+        (value,) = await RedisCache.get_many([key], request)
+        return value
+
+    @staticmethod
+    async def get_many(keys: Sequence[str], request: Request) -> List[object]:
+        """
+        Look up several keys, the ones missing from the local cache with a single MGET
+        @return: the value of each key, None for misses
+        """
+        local_cache = request.app.state.local_cache
+        values = [None] * len(keys)
+        missing = []
+        for index, key in enumerate(keys):
+            if local_cache is not None:
+                values[index] = local_cache.get(key)
+            if values[index] is None:
+                missing.append(index)
+            else:
+                record_lookup(key, "l1")
+        if not missing:
+            return values
+
+        stats = request.app.state.cache_stats
+        codec = request.app.state.cache_codec
+        missing_keys = [keys[index] for index in missing]
+        found = await _execute(request, missing_keys, "mget", missing_keys)
+        for index, data in zip(missing, found or [None] * len(missing)):
+            value = None
             if data:
-                return json.loads(data)
-            return None
-        except ConnectionError:
-            raise HTTPException(
-                status_code=status.HTTP_502_BAD_GATEWAY,
-                detail="Redis connectivity failed",
+                try:
+                    value = codec.decode(data)
+                except ValueError as e:
+                    logger.debug("Ignoring cached value of {0}: {1}", keys[index], e)
+            if value is None:
+                stats.misses += 1
+                record_lookup(keys[index], None)
+                continue
+            stats.hits += 1
+            record_lookup(keys[index], "l2")
+            values[index] = value
+            if local_cache is not None:
+                local_cache.set(keys[index], value, len(data))
+        return values
+
+    @staticmethod
+    async def delete(key, request: Request):
+        await RedisCache.delete_many([key], request)
+
+    @staticmethod
+    async def delete_many(keys: Sequence[str], request: Request):
+        """
+        Delete several keys and publish them for eviction, in one round trip
+        """
+        if not keys:
+            return
+        settings = get_app_settings()
+        if request.app.state.local_cache is not None:
+            request.app.state.local_cache.delete(keys)
+        await _pipeline(
+            request,
+            keys,
+            [
+                ("delete", *keys),
+                (
+                    "publish",
+                    settings.cache_invalidation_channel,
+                    invalidation_message(keys),
+                ),
+            ],
+        )
+
+    @staticmethod
+    async def invalidate_tag(tag, request: Request):
+        """
+        Delete every key added to `tag`, and the tag itself
+        """
+        keys = await _execute(request, [tag], "smembers", tag)
+        await RedisCache.delete_many(
+            [*(key.decode() for key in keys or ()), tag], request
+        )
+
+    @staticmethod
+    async def lock(key, token: str, ttl_ms: int, request: Request) -> bool:
+        """
+        Take the short lived lock `key` with SET NX PX
+        @return: whether the lock was taken, True as well when Redis is unavailable, the
+        caller then proceeds without the lock
+        """
+
+        async def acquire() -> bool:
+            return bool(
+                await request.app.state.cache.set(key, token, nx=True, px=ttl_ms)
             )
 
+        return await _guarded(request, [key], "lock", acquire) is not False
+
+    @staticmethod
+    async def locked(key, request: Request) -> bool:
+        """
+        @return: whether the lock `key` is held, False when Redis is unavailable
+        """
+        return bool(await _execute(request, [key], "exists", key))
+
+    @staticmethod
+    async def unlock(key, token: str, request: Request):
+        # only while the lock still holds the token of its owner
+        await _execute(request, [key], "delete_if_equals", key, token)
+
 
 redis_cache = RedisCache()
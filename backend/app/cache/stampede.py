@@ -0,0 +1,53 @@
+import asyncio
+import math
+import random
+import time
+from typing import Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Concurrent calls for the same key within a worker share the result of the first one,
+    including its exception. Waiting callers take over when the first call is cancelled.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._in_flight
+
+    async def run(self, key: str, call: Callable[[], Awaitable]):
+        while key in self._in_flight:
+            future = self._in_flight[key]
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # retrieved here so a call nobody waited for is not reported as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+
+def refresh_early(delta: float, expires_at: float, beta: float) -> bool:
+    """
+    XFetch: decide whether to recompute a value before it expires, with a probability
+    growing as the expiry approaches and with the time `delta` the value took to compute,
+    so hot keys get refreshed by a single caller ahead of their expiry
+    """
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
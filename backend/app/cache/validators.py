@@ -0,0 +1,27 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import NamedTuple, Optional
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[str] = None
+
+
+def content_validators(content) -> Validators:
+    """
+    Validators of JSON compatible content: an ETag hashing the content, and the updated_at
+    of a single object as Last-Modified.
+    Pages and lists only get the ETag, removing an item changes them without raising the
+    newest updated_at of the items.
+    """
+    encoded = json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+    etag = f'"{hashlib.blake2b(encoded, digest_size=16).hexdigest()}"'
+    updated_at = content.get("updated_at") if isinstance(content, dict) else None
+    if not isinstance(updated_at, str):
+        return Validators(etag)
+    # updated_at is stored as naive UTC
+    last_modified = datetime.fromisoformat(updated_at).replace(tzinfo=timezone.utc)
+    return Validators(etag, format_datetime(last_modified, usegmt=True))
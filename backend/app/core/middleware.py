@@ -0,0 +1,117 @@
+import asyncio
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.app.cache.instrumentation import RequestCacheStats, request_cache_stats
+from backend.app.db.instrumentation import (
+    QueryStats,
+    record_route_stats,
+    request_query_stats,
+)
+
+
+class ServerTimingMiddleware:
+    """
+    Collects the database statements of each request, reports them in the Server-Timing
+    response header and adds them to the per-route aggregates.
+    The cache lookups and Redis calls of the request are reported alongside, when it made any.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        cache_stats = RequestCacheStats()
+        token = request_query_stats.set(stats)
+        cache_token = request_cache_stats.set(cache_stats)
+
+        async def send_with_server_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                server_timing = stats.server_timing()
+                if cache_stats.hits or cache_stats.misses or cache_stats.calls:
+                    server_timing += ", " + cache_stats.server_timing()
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            request_cache_stats.reset(cache_token)
+            request_query_stats.reset(token)
+            # the router stores the matched route in the scope
+            route = scope.get("route")
+            if route is not None:
+                record_route_stats(f"{scope['method']} {route.path}", stats)
+
+
+class CancelOnDisconnectMiddleware:
+    """
+    Cancels the request handler when the client disconnects before the response is complete,
+    cancelling the database statement it waits on along with it.
+    The body is not buffered and the disconnect is read after it, so a handler leaving a body
+    of several chunks unread is not cancelled.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        messages: asyncio.Queue = asyncio.Queue()
+        response_complete = False
+        disconnected = False
+
+        async def send_tracking_completion(message: Message) -> None:
+            nonlocal response_complete
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                response_complete = True
+
+        async def receive_from_watcher() -> Message:
+            message = await messages.get()
+            messages.task_done()
+            return message
+
+        app_task = asyncio.create_task(
+            self.app(scope, receive_from_watcher, send_tracking_completion)
+        )
+
+        async def watch_disconnect() -> None:
+            nonlocal disconnected
+            more_body = True
+            while True:
+                if more_body:
+                    # the body is not buffered, a chunk is only read once the app took
+                    # the previous one. After the last chunk only the disconnect follows
+                    await messages.join()
+                message = await receive()
+                # background tasks run after the response and are left alone
+                if message["type"] == "http.disconnect" and not response_complete:
+                    disconnected = True
+                    app_task.cancel()
+                    return
+                more_body = message.get("more_body", False)
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await app_task
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+        finally:
+            watcher.cancel()
@@ -1,13 +1,17 @@
 import logging
 import sys
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from loguru import logger
-from pydantic import PostgresDsn
+from pydantic import PostgresDsn, validator
 
 from backend.app.core.logging import InterceptHandler
 from backend.app.core.settings.base import BaseAppSettings
 
+# names of backend.app.cache.codecs, orjson, msgpack, zstd and lz4 need the cache extra
+CACHE_CODECS = ("json", "orjson", "msgpack")
+CACHE_COMPRESSIONS = ("zlib", "zstd", "lz4")
+
 
 class AppSettings(BaseAppSettings):
     debug: bool = True
@@ -32,14 +36,60 @@ class AppSettings(BaseAppSettings):
     workers: int = 10
 
     database_url: Union[PostgresDsn, str] = ""
+    database_replica_urls: List[Union[PostgresDsn, str]] = []
+    db_replica_ejection_seconds: int = 30
     db_schema: str = "MY_DB_SCHEMA"
     max_db_pool_size: int = 10
     min_db_pool_size: int = 5
     pool_recycle: int = 3600
     db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 30000
+    # e.g. {"GET /api/books/get-user-books": 5000}
+    db_route_statement_timeouts_ms: Dict[str, int] = {}
+    cancel_on_disconnect: bool = True
+    db_cancel_timeout_ms: int = 1000
+    book_stats_from_summary: bool = False
+    db_pool_warm_up: bool = True
+    db_pool_auto_tune: bool = False
+    db_pool_tune_interval: int = 30
+    db_pool_tune_wait_ms: int = 20
+    db_pool_tune_step: int = 2
+    db_sync_executor: bool = True
+    db_copy_chunk_size: int = 10000
+    db_insert_chunk_size: int = 1000
+    default_page_size: int = 50
+    max_page_size: int = 500
+    db_query_instrumentation: bool = True
+    db_n_plus_one_threshold: int = 5
+    db_unit_of_work: bool = True
+    db_stream_batch_size: int = 1000
+    db_write_behind: bool = False
+    db_write_behind_max_rows: int = 500
+    db_write_behind_max_delay_ms: int = 5
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_key_expiry: int = 120
+    redis_max_connections: int = 50
+    redis_timeout_ms: int = 50
+    redis_health_check_interval: int = 15
+    redis_breaker_failure_threshold: int = 5
+    redis_breaker_reset_seconds: float = 5
+    cache_backend: str = "redis"
+    cache_memory_max_keys: int = 100000
+    cache_codec: str = "json"
+    cache_compression: Optional[str] = None
+    cache_compression_threshold: int = 1024
+    cache_xfetch_beta: float = 1.0
+    cache_lock_ttl_ms: int = 5000
+    cache_lock_wait_ms: int = 500
+    cache_lock_poll_ms: int = 10
+    cache_error_expiry: int = 5
+    cache_local: bool = True
+    cache_local_max_entries: int = 10000
+    cache_local_max_bytes: int = 64 * 1024 * 1024
+    cache_local_ttl: float = 5
+    cache_invalidation_channel: str = "cache:invalidate"
+    cache_invalidation_retry_seconds: float = 1
     secret_key: str = "aa9873796bd5a9ac78edb1123aff667e45mm92861c15c7468d5ff036aa9420f0"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 300
@@ -67,6 +117,32 @@ class AppSettings(BaseAppSettings):
     class Config:
         validate_assignment = True
 
+    @validator("min_db_pool_size")
+    def validate_pool_sizes(cls, value, values):
+        if value > values.get("max_db_pool_size", value):
+            raise ValueError("min_db_pool_size must not exceed max_db_pool_size")
+        return value
+
+    @validator("cache_backend")
+    def validate_cache_backend(cls, value):
+        if value not in ("redis", "memory"):
+            raise ValueError("cache_backend must be redis or memory")
+        return value
+
+    @validator("cache_codec")
+    def validate_cache_codec(cls, value):
+        if value not in CACHE_CODECS:
+            raise ValueError(f"cache_codec must be one of {', '.join(CACHE_CODECS)}")
+        return value
+
+    @validator("cache_compression")
+    def validate_cache_compression(cls, value):
+        if value is not None and value not in CACHE_COMPRESSIONS:
+            raise ValueError(
+                f"cache_compression must be one of {', '.join(CACHE_COMPRESSIONS)} or unset"
+            )
+        return value
+
     @property
     def fastapi_kwargs(self) -> Dict[str, Any]:
         return {
@@ -7,8 +7,8 @@ class DevAppSettings(AppSettings):
     debug: bool = True
 
     title: str = "FastAPI Skeleton Project - Dev"
-    max_db_pool_size: int = 2
-    min_db_pool_size: int = 4
+    max_db_pool_size: int = 4
+    min_db_pool_size: int = 2
     environment = "development"
 
     logging_level: int = logging.DEBUG
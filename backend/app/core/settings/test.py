@@ -13,6 +13,8 @@ class TestAppSettings(AppSettings):
     min_db_pool_size: int = 5
     pool_recycle: int = 3600
     logging_level: int = logging.DEBUG
+    # tests run without a Redis server
+    cache_backend: str = "memory"
     environment = "test"
 
     class Config(AppSettings.Config):
@@ -0,0 +1,226 @@
+import time
+from itertools import islice
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Union
+
+from loguru import logger
+from sqlalchemy import Column, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlmodel import SQLModel
+
+from backend.app.core.config import settings
+from backend.app.db.unit_of_work import call_session, commit_or_flush
+
+_POSTGRESQL = postgresql.dialect()
+
+
+class BulkLoadResult(NamedTuple):
+    rows: int
+    chunks: int
+    elapsed: float
+
+
+class ChunkTiming(NamedTuple):
+    rows: int
+    elapsed: float
+
+
+class BulkInsertResult(NamedTuple):
+    items: list
+    chunks: List[ChunkTiming]
+    elapsed: float
+
+
+def insert_values(instance) -> dict:
+    """
+    Column values of `instance` for an INSERT, an unset primary key is left to the table default
+    """
+    return {
+        column.name: getattr(instance, column.name)
+        for column in instance.__table__.columns
+        if not (column.primary_key and getattr(instance, column.name) is None)
+    }
+
+
+def _primary_key(instance) -> Column:
+    (column,) = instance.__table__.primary_key.columns
+    return column
+
+
+async def assign_primary_keys(
+    session: Union[Session, AsyncSession], instance, values: List[dict]
+) -> None:
+    """
+    Fill in the primary keys `values` leave to the table default, drawn from its sequence in
+    one round trip. PostgreSQL returns the rows of a multi-row INSERT ... RETURNING in no
+    guaranteed order, with their keys known up front they are matched by in_values_order.
+    """
+    column = _primary_key(instance)
+    missing = [row for row in values if row.get(column.name) is None]
+    if not missing:
+        return
+    table_name = _POSTGRESQL.identifier_preparer.format_table(instance.__table__)
+    sequence = func.pg_get_serial_sequence(table_name, column.name)
+    result = await call_session(
+        session,
+        "execute",
+        select(func.nextval(sequence)).select_from(
+            func.generate_series(1, len(missing))
+        ),
+    )
+    for row, key in zip(missing, result.scalars().all()):
+        row[column.name] = key
+
+
+def insert_returning_statement(
+    instance, values: List[dict], returning: Optional[Sequence] = None
+):
+    """
+    Multi-row INSERT ... RETURNING, the rows come back in no guaranteed order
+    @return: statement returning `instance` objects, or rows of the primary key followed
+    by the `returning` columns
+    """
+    table = instance.__table__
+    if returning:
+        return (
+            insert(table).values(values).returning(_primary_key(instance), *returning)
+        )
+    return (
+        select(instance)
+        .from_statement(insert(table).values(values).returning(*table.columns))
+        .execution_options(populate_existing=True)
+    )
+
+
+def in_values_order(
+    instance, values: List[dict], rows: list, returning: Optional[Sequence] = None
+) -> list:
+    """
+    Match the rows of insert_returning_statement to `values` on their primary keys, see
+    assign_primary_keys
+    @return: `instance` objects, or tuples of the `returning` columns, in the order of `values`
+    """
+    key = _primary_key(instance).name
+    if returning:
+        by_key = {row[0]: tuple(row[1:]) for row in rows}
+    else:
+        by_key = {getattr(row, key): row for row in rows}
+    return [by_key[row[key]] for row in values]
+
+
+def _copy_columns(instance) -> List[str]:
+    # primary keys are left to the table default (sequence) like an ORM insert would
+    return [
+        column.name for column in instance.__table__.columns if not column.primary_key
+    ]
+
+
+async def copy_to_db(
+    session: AsyncSession,
+    instance,
+    objects: Iterable[SQLModel],
+    chunk_size: int = None,
+) -> BulkLoadResult:
+    """
+    Bulk load objects into the table of `instance` with PostgreSQL COPY (asyncpg driver only).
+    Objects are consumed lazily and sent in chunks of `chunk_size`, in the transaction of the
+    session (committed as in update_db).
+    @return: BulkLoadResult with the inserted row count, chunk count and elapsed seconds
+    """
+    chunk_size = chunk_size or settings.db_copy_chunk_size
+    table = instance.__table__
+    columns = _copy_columns(instance)
+    records = (tuple(getattr(obj, column) for column in columns) for obj in objects)
+
+    started = time.perf_counter()
+    rows = chunks = 0
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    try:
+        if not driver_connection.is_in_transaction():
+            # the asyncpg adapter only sends BEGIN with the first statement, without one
+            # COPY would commit on its own, outside of the transaction of the session
+            await connection.exec_driver_sql("SELECT 1")
+        while chunk := list(islice(records, chunk_size)):
+            await driver_connection.copy_records_to_table(
+                table.name,
+                records=chunk,
+                columns=columns,
+                schema_name=table.schema,
+            )
+            rows += len(chunk)
+            chunks += 1
+        await commit_or_flush(session)
+    except Exception:
+        await session.rollback()
+        raise
+    result = BulkLoadResult(
+        rows=rows, chunks=chunks, elapsed=time.perf_counter() - started
+    )
+    logger.info(
+        "Copied {0} rows into {1} in {2} chunks ({3:.3f}s)",
+        result.rows,
+        table.fullname,
+        result.chunks,
+        result.elapsed,
+    )
+    return result
+
+
+async def bulk_insert_to_db(
+    session: Union[Session, AsyncSession],
+    instance,
+    objects: Iterable[SQLModel],
+    chunk_size: int = None,
+    returning: Optional[Sequence] = None,
+) -> BulkInsertResult:
+    """
+    Insert objects into the table of `instance` with one multi-row INSERT ... RETURNING per
+    chunk of `chunk_size`, in the transaction of the session (committed as in update_db).
+    Objects are consumed lazily, primary keys and server defaults come back with the rows.
+    Primary keys are drawn from the sequence first, one extra round trip per chunk, and
+    the returned rows put back in insertion order by key.
+    @return: BulkInsertResult with the inserted objects, or row tuples of the `returning`
+    columns, in insertion order, the row count and elapsed seconds of every chunk and in total
+    """
+    chunk_size = chunk_size or settings.db_insert_chunk_size
+    values = (insert_values(obj) for obj in objects)
+
+    started = time.perf_counter()
+    items, chunks = [], []
+    try:
+        while chunk := list(islice(values, chunk_size)):
+            chunk_started = time.perf_counter()
+            await assign_primary_keys(session, instance, chunk)
+            result = await call_session(
+                session,
+                "execute",
+                insert_returning_statement(instance, chunk, returning),
+            )
+            rows = result.all() if returning else result.scalars().all()
+            items.extend(in_values_order(instance, chunk, rows, returning))
+            chunks.append(ChunkTiming(len(chunk), time.perf_counter() - chunk_started))
+            logger.debug(
+                "Inserted chunk of {0} rows into {1} ({2:.3f}s)",
+                chunks[-1].rows,
+                instance.__table__.fullname,
+                chunks[-1].elapsed,
+            )
+        await commit_or_flush(session)
+    except Exception:
+        await call_session(session, "rollback")
+        raise
+    result = BulkInsertResult(
+        items=items, chunks=chunks, elapsed=time.perf_counter() - started
+    )
+    logger.info(
+        "Inserted {0} rows into {1} in {2} chunks ({3:.3f}s)",
+        len(items),
+        instance.__table__.fullname,
+        len(chunks),
+        result.elapsed,
+    )
+    return result
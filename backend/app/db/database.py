@@ -1,72 +1,183 @@
-from typing import Union
+import asyncio
+from typing import AsyncIterator, Optional, Sequence, Union
 
-from sqlalchemy import select
+from loguru import logger
+from sqlalchemy import inspect, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from starlette.requests import Request
 
+from backend.app.core.config import settings
+from backend.app.db.bulk import bulk_insert_to_db, insert_values
+from backend.app.db.executor import db_executor_slot, run_in_db_executor
+from backend.app.db.pagination import Page, decode_cursor, encode_cursor
+from backend.app.db.routing import (
+    PIN_PRIMARY_KEY,
+    READ_REPLICA_OPTION,
+    pin_to_primary,
+    replica_ejected,
+)
+from backend.app.db.timeouts import (
+    STATEMENT_TIMEOUT_KEY,
+    cancel_async_statements,
+    route_statement_timeout,
+    statement_timeout_sql,
+)
+from backend.app.db.unit_of_work import call_session, commit_or_flush, unit_of_work
+from backend.app.db.write_behind import WRITE_BEHIND_KEY
+
 
 async def get_db(request: Request) -> Union[AsyncSession, Session]:
     settings = request.app.state.settings
     is_driver_async = settings.database_url.startswith("postgresql+asyncpg")
+    timeout_ms = route_statement_timeout(request)
     if is_driver_async:
         async with request.app.state.db_session() as session:
-            yield session
+            if timeout_ms is not None:
+                session.info[STATEMENT_TIMEOUT_KEY] = timeout_ms
+            async with unit_of_work(session, request):
+                yield session
     else:
-        with request.app.state.db_session() as session:
-            yield session
+        async with db_executor_slot(request.app.state.db_executor):
+            session = request.app.state.db_session()
+            if timeout_ms is not None:
+                session.info[STATEMENT_TIMEOUT_KEY] = timeout_ms
+            try:
+                async with unit_of_work(session, request):
+                    yield session
+            finally:
+                await run_in_db_executor(session, session.close)
+
+
+async def _execute_routed(session: Union[Session, AsyncSession], statement):
+    is_driver_async = isinstance(session, AsyncSession)
+    try:
+        if is_driver_async:
+            return await session.execute(statement)
+        return await run_in_db_executor(session, session.execute, statement)
+    except asyncio.CancelledError:
+        # sync sessions are taken care of by run_in_db_executor
+        if is_driver_async:
+            await cancel_async_statements(session)
+        raise
+    except (DBAPIError, OSError):
+        on_replica = statement.get_execution_options().get(READ_REPLICA_OPTION)
+        if (
+            not on_replica
+            or session.info.get(PIN_PRIMARY_KEY)
+            or not replica_ejected(session)
+        ):
+            # timeouts, cancelled queries and other errors of the statement itself
+            raise
+        # the replica is unreachable, retry the read once on the primary
+        pin_to_primary(session)
+        return await _execute_routed(session, statement)
+
+
+async def _set_statement_timeout(
+    session: Union[Session, AsyncSession], statement, timeout_ms: int
+) -> None:
+    # routed like the statement, so the timeout lands on the connection running it
+    on_replica = statement.get_execution_options().get(READ_REPLICA_OPTION, False)
+    await _execute_routed(
+        session,
+        statement_timeout_sql(timeout_ms).execution_options(
+            **{READ_REPLICA_OPTION: on_replica}
+        ),
+    )
+
+
+async def _execute(
+    session: Union[Session, AsyncSession], statement, timeout_ms: Optional[int] = None
+):
+    """
+    Execute `statement`, under a statement timeout of its own if `timeout_ms` is given
+    """
+    if timeout_ms is None:
+        return await _execute_routed(session, statement)
+    await _set_statement_timeout(session, statement, timeout_ms)
+    result = await _execute_routed(session, statement)
+    # a failed statement aborts the transaction, and with it the SET LOCAL
+    await _set_statement_timeout(
+        session,
+        statement,
+        session.info.get(STATEMENT_TIMEOUT_KEY, settings.db_statement_timeout_ms),
+    )
+    return result
 
 
 async def update_db(
-    session: Union[Session, AsyncSession], instance, refresh_data=False
+    session: Union[Session, AsyncSession], instance, refresh_data=False, durable=False
 ) -> any:
-    is_driver_async = isinstance(session, AsyncSession)
+    """
+    Save `instance`, or a list of instances
+    A list of new objects of one model is inserted with bulk_insert_to_db and comes back as
+    populated objects, other lists are added to the session.
+    Inside a unit of work the changes are only flushed and get committed with the request,
+    otherwise they are committed right away. Errors are rolled back and re-raised.
+    New single objects go through the write-behind writer when it is enabled, unless `durable`
+    asks for them to be written in the session of the caller.
+    @return: the saved instance(s), the inserted row(s) for bulk and write-behind inserts
+    """
     if isinstance(instance, list):
-        if is_driver_async:
-            try:
-                session.bulk_save_objects(instance)
-                await session.commit()
-                if refresh_data:
-                    await session.refresh(instance)
-                print("DB Updated")
-                return instance
-            except Exception as e:
-                print(e)
-                await session.rollback()
-        else:
-            try:
-                session.bulk_save_objects(instance)
-                session.commit()
-                if refresh_data:
-                    session.refresh(instance)
-                print("DB Updated")
-                return instance
-            except Exception as e:
-                print(e)
-                session.rollback()
+        models = {type(obj) for obj in instance}
+        if len(models) == 1 and all(inspect(obj).transient for obj in instance):
+            return (await bulk_insert_to_db(session, models.pop(), instance)).items
     else:
-        if is_driver_async:
-            try:
-                session.add(instance)
-                await session.commit()
-                if refresh_data:
-                    await session.refresh(instance)
-                print("DB Updated")
-                return instance
-            except Exception as e:
-                print(e)
-                await session.rollback()
+        writer = session.info.get(WRITE_BEHIND_KEY)
+        if writer is not None and not durable and inspect(instance).transient:
+            return await writer.submit(instance)
+
+    try:
+        if isinstance(instance, list):
+            session.add_all(instance)
         else:
-            try:
-                session.add(instance)
-                session.commit()
-                if refresh_data:
-                    session.refresh(instance)
-                print("DB Updated")
-                return instance
-            except Exception as e:
-                print(e)
-                session.rollback()
+            session.add(instance)
+        await commit_or_flush(session)
+        if refresh_data:
+            for obj in instance if isinstance(instance, list) else [instance]:
+                await call_session(session, "refresh", obj)
+    except Exception:
+        await call_session(session, "rollback")
+        raise
+    logger.debug("DB Updated")
+    return instance
+
+
+async def insert_if_absent(
+    session: Union[Session, AsyncSession],
+    instance,
+    conflict_columns: Sequence[str],
+    index_where=None,
+):
+    """
+    Insert `instance` with INSERT ... ON CONFLICT DO NOTHING RETURNING in a single round trip.
+    `conflict_columns` must be backed by a unique index, `index_where` is the predicate of a
+    partial one and defaults to live rows for soft deletable models.
+    @return: the inserted object, or None if a live row with the same conflict_columns exists
+    """
+    model = type(instance)
+    table = model.__table__
+    if index_where is None and "is_deleted" in table.c:
+        index_where = ~table.c.is_deleted
+    statement = (
+        select(model)
+        .from_statement(
+            insert(table)
+            .values(**insert_values(instance))
+            .on_conflict_do_nothing(
+                index_elements=conflict_columns, index_where=index_where
+            )
+            .returning(*table.columns)
+        )
+        .execution_options(populate_existing=True)
+    )
+    result = await _execute(session, statement)
+    output = result.scalar()
+    await commit_or_flush(session)
+    return output
 
 
 # async def get_from_db(
@@ -87,22 +198,181 @@ async def update_db(
 #     return output
 
 
+def _live_rows(instance, include_deleted: bool, kwargs: dict) -> dict:
+    """
+    @return: kwargs filtering out soft deleted rows unless they are asked for
+    """
+    if include_deleted or "is_deleted" in kwargs or not hasattr(instance, "is_deleted"):
+        return kwargs
+    return {**kwargs, "is_deleted": False}
+
+
+def _select_statement(instance, read_only, options, columns, **kwargs):
+    statement = (select(*columns) if columns else select(instance)).filter_by(**kwargs)
+    if options:
+        statement = statement.options(*options)
+    if read_only:
+        # lets a routing session serve the query from a read replica
+        statement = statement.execution_options(**{READ_REPLICA_OPTION: True})
+    return statement
+
+
 async def get_from_db(
-    session: Union[Session, AsyncSession], instance, multiple=True, **kwargs
+    session: Union[Session, AsyncSession],
+    instance,
+    multiple=True,
+    read_only=False,
+    options: Sequence = (),
+    columns: Optional[Sequence] = None,
+    timeout_ms: Optional[int] = None,
+    include_deleted=False,
+    **kwargs,
 ):
-    is_driver_async = isinstance(session, AsyncSession)
-    statement = select(instance).filter_by(**kwargs)
+    """
+    Query `instance` rows matching kwargs, soft deleted rows only with `include_deleted`
+    `options` are loader options (noload, selectinload, raiseload, load_only, ...) for the query,
+    `columns` projects the query to those columns and returns rows instead of objects,
+    `timeout_ms` overrides the statement timeout of the route for this query
+    @return: object / row, or a list of them if multiple
+    """
+    kwargs = _live_rows(instance, include_deleted, kwargs)
+    statement = _select_statement(instance, read_only, options, columns, **kwargs)
 
-    if is_driver_async:
-        result = await session.execute(statement)
-    else:
-        result = session.execute(statement)
+    result = await _execute(session, statement, timeout_ms)
 
-    if multiple:
-        output = (
-            [row[0] for row in result] if is_driver_async else result.scalars().all()
-        )
+    if columns:
+        output = result.all() if multiple else result.first()
+    elif multiple:
+        output = result.scalars().all()
     else:
-        output = result.scalar() if is_driver_async else result.scalar()
+        output = result.scalar()
 
     return output
+
+
+async def aggregate_from_db(
+    session: Union[Session, AsyncSession],
+    instance,
+    aggregates: Sequence,
+    group_by: Sequence = (),
+    joins: Sequence = (),
+    where: Sequence = (),
+    read_only=False,
+    timeout_ms: Optional[int] = None,
+    include_deleted=False,
+    **kwargs,
+) -> list:
+    """
+    Single aggregate query (count, sum, avg, ...) over `instance` rows matching kwargs,
+    grouped and ordered by the `group_by` columns. Soft deleted rows as in get_from_db.
+    `joins` are (target, onclause) pairs, `where` extra criteria e.g. on the joined tables
+    @return: list of rows holding the group_by columns followed by the aggregates
+    """
+    kwargs = _live_rows(instance, include_deleted, kwargs)
+    statement = select(*group_by, *aggregates).select_from(instance).filter_by(**kwargs)
+    for target, onclause in joins:
+        statement = statement.join(target, onclause)
+    if where:
+        statement = statement.where(*where)
+    if group_by:
+        statement = statement.group_by(*group_by).order_by(*group_by)
+    if read_only:
+        statement = statement.execution_options(**{READ_REPLICA_OPTION: True})
+
+    result = await _execute(session, statement, timeout_ms)
+    return result.all()
+
+
+async def stream_from_db(
+    session: Union[Session, AsyncSession],
+    instance,
+    batch_size: Optional[int] = None,
+    read_only=False,
+    options: Sequence = (),
+    columns: Optional[Sequence] = None,
+    timeout_ms: Optional[int] = None,
+    include_deleted=False,
+    **kwargs,
+) -> AsyncIterator[list]:
+    """
+    Streaming get_from_db, rows are fetched through a server-side cursor and yielded in
+    batches of up to `batch_size`, so memory stays flat however large the result is.
+    `timeout_ms` overrides the statement timeout for the rest of the transaction.
+    @return: async iterator over lists of objects, or of rows if `columns` are given
+    """
+    batch_size = batch_size or settings.db_stream_batch_size
+    kwargs = _live_rows(instance, include_deleted, kwargs)
+    statement = _select_statement(
+        instance, read_only, options, columns, **kwargs
+    ).execution_options(stream_results=True, yield_per=batch_size)
+    if timeout_ms is not None:
+        await _set_statement_timeout(session, statement, timeout_ms)
+
+    if isinstance(session, AsyncSession):
+        result = await session.stream(statement)
+        if not columns:
+            result = result.scalars()
+        try:
+            async for batch in result.partitions(batch_size):
+                yield batch
+        except asyncio.CancelledError:
+            await cancel_async_statements(session)
+            raise
+        finally:
+            await result.close()
+    else:
+        result = await run_in_db_executor(session, session.execute, statement)
+        if not columns:
+            result = result.scalars()
+        partitions = result.partitions(batch_size)
+        try:
+            while True:
+                batch = await run_in_db_executor(session, next, partitions, None)
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            await run_in_db_executor(session, result.close)
+
+
+async def get_page_from_db(
+    session: Union[Session, AsyncSession],
+    instance,
+    limit: int,
+    cursor: Optional[str] = None,
+    read_only=False,
+    options: Sequence = (),
+    timeout_ms: Optional[int] = None,
+    include_deleted=False,
+    **kwargs,
+) -> Page:
+    """
+    Keyset paginated query ordered by (created_at, id), `timeout_ms` and soft deleted rows
+    as in get_from_db
+    Raises ValueError for a malformed cursor
+    @return: Page with up to `limit` rows and the cursor of the next page, if any
+    """
+    kwargs = _live_rows(instance, include_deleted, kwargs)
+    statement = (
+        select(instance)
+        .filter_by(**kwargs)
+        .order_by(instance.created_at, instance.id)
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        statement = statement.where(
+            tuple_(instance.created_at, instance.id) > tuple_(*decode_cursor(cursor))
+        )
+    if options:
+        statement = statement.options(*options)
+    if read_only:
+        statement = statement.execution_options(**{READ_REPLICA_OPTION: True})
+
+    result = await _execute(session, statement, timeout_ms)
+    rows = result.scalars().unique().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return Page(items=rows, next_cursor=next_cursor)
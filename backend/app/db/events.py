@@ -1,12 +1,27 @@
+import asyncio
+
 from fastapi import FastAPI
 from loguru import logger
 from sqlalchemy import create_engine
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
-from sqlmodel import SQLModel
 
 from backend.app.core.settings.app import AppSettings
+from backend.app.db.executor import DB_EXECUTOR_KEY, create_db_executor
+from backend.app.db.instrumentation import instrument_engines
+from backend.app.db.migrations.migrator import drop_schema, run_migrations
+from backend.app.db.pool import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    PoolAutoTuner,
+    warm_up_pool,
+)
+from backend.app.db.routing import ReplicaSet, RoutingSession
+from backend.app.db.timeouts import (
+    register_statement_timeouts,
+    statement_timeout_connect_args,
+)
+from backend.app.db.write_behind import WRITE_BEHIND_KEY, WriteBehindWriter
 
 # from backend.app.db.initial_data_loader import load_initial_data_to_db
 
@@ -27,51 +42,136 @@ async def connect_to_db(app: FastAPI, settings: AppSettings) -> None:
     logger.info("Connecting to {0}", repr(settings.database_url))
     is_driver_async = settings.database_url.startswith("postgresql+asyncpg")
     app.state.settings = settings
+    # min_db_pool_size connections are kept open, overflow ones up to max_db_pool_size
+    engine_kwargs = dict(
+        pool_size=settings.min_db_pool_size,
+        max_overflow=settings.max_db_pool_size - settings.min_db_pool_size,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        poolclass=(
+            InstrumentedAsyncAdaptedQueuePool
+            if is_driver_async
+            else InstrumentedQueuePool
+        ),
+        connect_args=statement_timeout_connect_args(is_driver_async),
+        future=True,
+        echo=False,
+    )
+    register_statement_timeouts()
+    # copied into every session, the write-behind writer is added once it exists
+    session_info = {}
+    if settings.database_replica_urls:
+        logger.info(
+            "Routing reads to {0} replica(s)", len(settings.database_replica_urls)
+        )
     if is_driver_async:
         logger.debug("Async mode")
-        app.state.engine = create_async_engine(
-            settings.database_url,
-            pool_size=settings.max_db_pool_size,
-            pool_recycle=settings.pool_recycle,
-            pool_pre_ping=settings.db_pool_pre_ping,
-            poolclass=QueuePool,
-            future=True,
-            echo=False,
-        )
+        app.state.engine = create_async_engine(settings.database_url, **engine_kwargs)
+        app.state.replica_engines = [
+            create_async_engine(url, **engine_kwargs)
+            for url in settings.database_replica_urls
+        ]
+        session_kwargs = {}
+        if app.state.replica_engines:
+            session_kwargs = dict(
+                sync_session_class=RoutingSession,
+                replicas=ReplicaSet(
+                    [engine.sync_engine for engine in app.state.replica_engines],
+                    settings.db_replica_ejection_seconds,
+                ),
+            )
         app.state.db_session = sessionmaker(
-            app.state.engine, expire_on_commit=False, class_=AsyncSession
+            app.state.engine,
+            expire_on_commit=False,
+            class_=AsyncSession,
+            info=session_info,
+            **session_kwargs,
         )
+        if settings.db_query_instrumentation:
+            instrument_engines(
+                [
+                    engine.sync_engine
+                    for engine in [app.state.engine, *app.state.replica_engines]
+                ]
+            )
         async with app.state.engine.begin() as conn:
             if DROP_TABLES:
                 logger.debug("Dropping all database tables in async mode")
-                await conn.run_sync(SQLModel.metadata.drop_all)
+                await conn.run_sync(drop_schema)
             if LOAD_INITIAL_DATA:
                 logger.debug("Loading initial data to database in async mode")
                 # await load_initial_data_to_
-            logger.debug("Creating database tables in async mode")
-            await conn.run_sync(SQLModel.metadata.create_all)
+            logger.debug("Checking database schema version in async mode")
+            await conn.run_sync(run_migrations)
     else:
         print("Sync mode")
-        app.state.engine = create_engine(
-            settings.database_url,
-            pool_size=settings.max_db_pool_size,
-            pool_recycle=settings.pool_recycle,
-            pool_pre_ping=settings.db_pool_pre_ping,
-            poolclass=QueuePool,
-            future=True,
-            echo=False,
+        app.state.engine = create_engine(settings.database_url, **engine_kwargs)
+        app.state.replica_engines = [
+            create_engine(url, **engine_kwargs)
+            for url in settings.database_replica_urls
+        ]
+        session_kwargs = {}
+        if app.state.replica_engines:
+            session_kwargs = dict(
+                class_=RoutingSession,
+                replicas=ReplicaSet(
+                    app.state.replica_engines, settings.db_replica_ejection_seconds
+                ),
+            )
+        app.state.db_executor = create_db_executor(settings)
+        session_info[DB_EXECUTOR_KEY] = app.state.db_executor
+        app.state.db_session = sessionmaker(
+            app.state.engine,
+            expire_on_commit=False,
+            info=session_info,
+            **session_kwargs,
         )
-        app.state.db_session = sessionmaker(app.state.engine, expire_on_commit=False)
-        if DROP_TABLES:
-            SQLModel.metadata.drop_all(bind=app.state.engine)
-        SQLModel.metadata.create_all(bind=app.state.engine)
+        if settings.db_query_instrumentation:
+            instrument_engines([app.state.engine, *app.state.replica_engines])
+        with app.state.engine.begin() as conn:
+            if DROP_TABLES:
+                drop_schema(conn)
+            run_migrations(conn)
         # if LOAD_INITIAL_DATA:
         #     await load_initial_data_to_db(app.state.db_session())
+    engines = [app.state.engine, *app.state.replica_engines]
+    if settings.db_pool_warm_up:
+        for engine in engines:
+            try:
+                await warm_up_pool(engine, settings.min_db_pool_size)
+            except Exception as e:
+                # an unreachable replica must not keep the app from starting
+                logger.warning("Pool warm-up of {0} failed: {1}", repr(engine.url), e)
+    app.state.write_behind = None
+    if settings.db_write_behind:
+        app.state.write_behind = WriteBehindWriter(
+            app.state.db_session,
+            max_rows=settings.db_write_behind_max_rows,
+            max_delay=settings.db_write_behind_max_delay_ms / 1000,
+            executor=getattr(app.state, "db_executor", None),
+        )
+        app.state.write_behind.start()
+        session_info[WRITE_BEHIND_KEY] = app.state.write_behind
+    app.state.pool_tuner_task = None
+    if settings.db_pool_auto_tune:
+        tuner = PoolAutoTuner(
+            engines,
+            max_overflow=settings.max_db_pool_size - settings.min_db_pool_size,
+            interval=settings.db_pool_tune_interval,
+            wait_threshold=settings.db_pool_tune_wait_ms / 1000,
+            step=settings.db_pool_tune_step,
+        )
+        app.state.pool_tuner_task = asyncio.create_task(tuner.run())
     logger.info("Connection established")
 
 
 async def close_db_connection(app: FastAPI) -> None:
     logger.info("Closing connection to database")
+    if app.state.pool_tuner_task is not None:
+        app.state.pool_tuner_task.cancel()
+    if app.state.write_behind is not None:
+        await app.state.write_behind.stop()
+
     # Dropping all tables in test environment on exit
     if app.state.settings.environment == "test":
         logger.info("Dropping all tables in test environment")
@@ -80,14 +180,20 @@ async def close_db_connection(app: FastAPI) -> None:
         )
         if is_driver_async:
             async with app.state.engine.begin() as conn:
-                await conn.run_sync(SQLModel.metadata.drop_all)
+                await conn.run_sync(drop_schema)
         else:
-            SQLModel.metadata.drop_all(bind=app.state.engine)
+            with app.state.engine.begin() as conn:
+                drop_schema(conn)
         logger.info("All tables dropped")
 
-    async def __aenter__(self):
-        async with app.state.db_session() as session:
-            await session.close()
-            await app.state.engine.dispose()
+    db_executor = getattr(app.state, "db_executor", None)
+    if db_executor is not None:
+        db_executor.shutdown(wait=True)
+
+    for engine in [app.state.engine, *app.state.replica_engines]:
+        if isinstance(engine, AsyncEngine):
+            await engine.dispose()
+        else:
+            engine.dispose()
 
     logger.info("Connection closed")
@@ -0,0 +1,72 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.app.core.settings.app import AppSettings
+from backend.app.db.timeouts import cancel_statements
+
+DB_EXECUTOR_KEY = "db_executor"
+
+
+class DBExecutor(ThreadPoolExecutor):
+    """
+    Thread pool running blocking sync-driver session calls off the event loop.
+    `slots` caps the sessions holding a connection at once to the worker count, so a worker never
+    blocks on a pool checkout while the call that would give a connection back is queued behind it.
+    """
+
+    def __init__(self, max_workers: int):
+        super().__init__(max_workers=max_workers, thread_name_prefix="db-executor")
+        self.slots = asyncio.Semaphore(max_workers)
+
+
+def create_db_executor(settings: AppSettings) -> Optional[DBExecutor]:
+    """
+    Create the executor for sync-driver sessions, sized to the connection pool
+    @return: DBExecutor or None if the executor mode is disabled
+    """
+    if not settings.db_sync_executor:
+        return None
+    return DBExecutor(max_workers=settings.max_db_pool_size)
+
+
+@asynccontextmanager
+async def db_executor_slot(executor: Optional[DBExecutor]) -> AsyncIterator[None]:
+    """
+    Wait without blocking the event loop until a session may be opened on the executor
+    """
+    if executor is None:
+        yield
+        return
+    async with executor.slots:
+        yield
+
+
+async def run_in_db_executor(
+    session: Session, func: Callable[..., Any], *args, **kwargs
+) -> Any:
+    """
+    Run a blocking session call on the executor bound to the session, keeping the event loop free.
+    Falls back to an inline call when the session has no executor bound to it.
+    Cancelling the call cancels the statements of the session on the server.
+    @return: result of the call
+    """
+    executor = session.info.get(DB_EXECUTOR_KEY)
+    if executor is None:
+        return func(*args, **kwargs)
+    context = contextvars.copy_context()
+    future = executor.submit(partial(context.run, func, *args, **kwargs))
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        cancel_statements(session)
+        if not future.cancel():
+            # the thread can't be interrupted, let it finish before the session is used again
+            with suppress(Exception):
+                await asyncio.wrap_future(future)
+        raise
@@ -0,0 +1,139 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.app.core.config import settings
+
+
+@dataclass
+class QueryStats:
+    """
+    Statements issued while handling one request
+    """
+
+    count: int = 0
+    duration: float = 0.0
+    slowest_duration: float = 0.0
+    slowest_statement: Optional[str] = None
+    statements: Counter = field(default_factory=Counter)
+    timeouts: int = 0
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+        if duration > self.slowest_duration:
+            self.slowest_duration = duration
+            self.slowest_statement = statement
+
+    def repeated_statements(self, threshold: int) -> Dict[str, int]:
+        """
+        Statements issued at least `threshold` times, the usual sign of an N+1 query pattern
+        """
+        return {
+            statement: count
+            for statement, count in self.statements.items()
+            if count >= threshold
+        }
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+@dataclass
+class RouteQueryStats:
+    """
+    Statement totals of all requests served by one route
+    """
+
+    requests: int = 0
+    statements: int = 0
+    duration: float = 0.0
+    max_statements: int = 0
+    slowest_duration: float = 0.0
+    slowest_statement: Optional[str] = None
+    n_plus_one_requests: int = 0
+    statement_timeouts: int = 0
+
+    def add(self, stats: QueryStats, n_plus_one: bool) -> None:
+        self.requests += 1
+        self.statement_timeouts += stats.timeouts
+        self.statements += stats.count
+        self.duration += stats.duration
+        self.max_statements = max(self.max_statements, stats.count)
+        self.n_plus_one_requests += int(n_plus_one)
+        if stats.slowest_duration > self.slowest_duration:
+            self.slowest_duration = stats.slowest_duration
+            self.slowest_statement = stats.slowest_statement
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "statements": self.statements,
+            "avg_statements": self.statements / self.requests,
+            "max_statements": self.max_statements,
+            "db_time_ms": round(self.duration * 1000, 3),
+            "avg_db_time_ms": round(self.duration * 1000 / self.requests, 3),
+            "slowest_statement_ms": round(self.slowest_duration * 1000, 3),
+            "slowest_statement": self.slowest_statement,
+            "n_plus_one_requests": self.n_plus_one_requests,
+            "statement_timeouts": self.statement_timeouts,
+        }
+
+
+request_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "request_query_stats", default=None
+)
+route_query_stats: Dict[str, RouteQueryStats] = {}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context.query_started
+    stats = request_query_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+
+def _handle_error(context) -> None:
+    # same message from psycopg2 and asyncpg, a cancelled statement reads "due to user request"
+    if "canceling statement due to statement timeout" in str(
+        context.original_exception
+    ):
+        stats = request_query_stats.get()
+        if stats is not None:
+            stats.timeouts += 1
+        logger.warning("Statement timed out: {0}", context.statement)
+
+
+def instrument_engines(engines: List[Engine]) -> None:
+    """
+    Record the statements of the engines into the stats of the request issuing them
+    """
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def record_route_stats(route: str, stats: QueryStats) -> None:
+    repeated = stats.repeated_statements(settings.db_n_plus_one_threshold)
+    for statement, count in repeated.items():
+        logger.warning(
+            "Possible N+1 query on {0}: statement issued {1} times: {2}",
+            route,
+            count,
+            statement,
+        )
+    route_query_stats.setdefault(route, RouteQueryStats()).add(
+        stats, n_plus_one=bool(repeated)
+    )
@@ -0,0 +1,101 @@
+from datetime import datetime
+
+from loguru import logger
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    inspect,
+    insert,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection
+from sqlmodel import SQLModel
+
+from backend.app.core.config import settings
+from backend.app.db.migrations import (
+    v0001_initial_schema,
+    v0002_lookup_indexes,
+    v0003_book_author_stats,
+    v0004_partial_lookup_indexes,
+)
+from backend.app.db.timeouts import statement_timeout_sql
+
+# models have to be imported so their tables are part of SQLModel.metadata
+from backend.app.models.books.book import Book  # noqa
+from backend.app.models.users.user import User  # noqa
+
+# ordered by VERSION, append new migration modules at the end
+MIGRATIONS = [
+    v0001_initial_schema,
+    v0002_lookup_indexes,
+    v0003_book_author_stats,
+    v0004_partial_lookup_indexes,
+]
+
+# key of the postgres advisory lock serialising workers applying migrations
+MIGRATION_LOCK_KEY = 7_305_420_211
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+    schema=settings.db_schema,
+)
+
+
+def current_version(connection: Connection) -> int:
+    if not inspect(connection).has_table(
+        schema_version.name, schema=schema_version.schema
+    ):
+        return 0
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def run_migrations(connection: Connection) -> None:
+    """
+    Bring the schema to the latest version. Runs inside the transaction of `connection`.
+    When the schema is current this is a single version check and no DDL is issued,
+    otherwise the migrations are applied under an advisory lock so only one worker applies them.
+    """
+    head = MIGRATIONS[-1].VERSION
+    if current_version(connection) >= head:
+        logger.debug("Database schema is at version {0}", head)
+        return
+    if connection.dialect.name == "postgresql":
+        # waiting for the lock and the DDL / backfills must not be cut short by
+        # db_statement_timeout_ms, the default of every connection
+        connection.execute(statement_timeout_sql(0))
+        # held until the transaction ends, workers waiting on it see the applied version below
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+        )
+    version = current_version(connection)
+    schema_version.create(bind=connection, checkfirst=True)
+    for migration in MIGRATIONS:
+        if migration.VERSION <= version:
+            continue
+        logger.info(
+            "Applying migration {0}: {1}", migration.VERSION, migration.DESCRIPTION
+        )
+        migration.upgrade(connection)
+        connection.execute(
+            insert(schema_version).values(
+                version=migration.VERSION, description=migration.DESCRIPTION
+            )
+        )
+
+
+def drop_schema(connection: Connection) -> None:
+    """
+    Drop all tables along with the schema version so the next start migrates from scratch
+    """
+    SQLModel.metadata.drop_all(bind=connection)
+    schema_version.drop(bind=connection, checkfirst=True)
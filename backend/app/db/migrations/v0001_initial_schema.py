@@ -0,0 +1,52 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from backend.app.core.config import settings
+
+VERSION = 1
+DESCRIPTION = "initial schema"
+
+# the schema as it was before versioning, fixed: later changes go in new migrations
+STATEMENTS = [
+    "CREATE TABLE IF NOT EXISTS {schema}.users ("
+    "first_name VARCHAR(100), "
+    "last_name VARCHAR(100), "
+    "phone VARCHAR(16), "
+    "id BIGSERIAL NOT NULL, "
+    "password_hash BYTEA NOT NULL, "
+    "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+    "updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+    "is_active BOOLEAN NOT NULL, "
+    "is_deleted BOOLEAN NOT NULL, "
+    "deleted_at TIMESTAMP WITHOUT TIME ZONE, "
+    "email VARCHAR NOT NULL, "
+    "PRIMARY KEY (id))",
+    "CREATE INDEX IF NOT EXISTS {users_id_index} ON {schema}.users (id)",
+    "CREATE TABLE IF NOT EXISTS {schema}.books ("
+    "name VARCHAR(100), "
+    "price FLOAT, "
+    "author VARCHAR(100), "
+    "id BIGSERIAL NOT NULL, "
+    "added_by BIGINT NOT NULL, "
+    "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+    "updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, "
+    "is_active BOOLEAN NOT NULL, "
+    "is_deleted BOOLEAN NOT NULL, "
+    "deleted_at TIMESTAMP WITHOUT TIME ZONE, "
+    "PRIMARY KEY (id), "
+    "FOREIGN KEY (added_by) REFERENCES {schema}.users (id))",
+    "CREATE INDEX IF NOT EXISTS {books_id_index} ON {schema}.books (id)",
+]
+
+
+def upgrade(connection: Connection) -> None:
+    # IF NOT EXISTS: databases created before versioning keep their tables
+    preparer = connection.dialect.identifier_preparer
+    names = dict(
+        schema=preparer.quote_schema(settings.db_schema),
+        # the names create_all gave the indexes of the primary keys
+        users_id_index=preparer.quote(f"ix_{settings.db_schema}_users_id"),
+        books_id_index=preparer.quote(f"ix_{settings.db_schema}_books_id"),
+    )
+    for statement in STATEMENTS:
+        connection.execute(text(statement.format(**names)))
@@ -0,0 +1,25 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from backend.app.core.config import settings
+
+VERSION = 2
+DESCRIPTION = (
+    "unique email / book name and user books pagination indexes over live rows"
+)
+
+# partial indexes, soft deleted rows may share the email / name of a live one
+INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_users_email_live "
+    "ON {schema}.users (email) WHERE NOT is_deleted",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_books_name_live "
+    "ON {schema}.books (name) WHERE NOT is_deleted",
+    "CREATE INDEX IF NOT EXISTS ix_books_live_added_by_created_at_id "
+    "ON {schema}.books (added_by, created_at, id) WHERE NOT is_deleted",
+]
+
+
+def upgrade(connection: Connection) -> None:
+    schema = connection.dialect.identifier_preparer.quote_schema(settings.db_schema)
+    for create_index in INDEXES:
+        connection.execute(text(create_index.format(schema=schema)))
@@ -0,0 +1,81 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from backend.app.core.config import settings
+
+VERSION = 3
+DESCRIPTION = "book_author_stats summary table maintained by a trigger on books"
+
+
+def upgrade(connection: Connection) -> None:
+    schema = connection.dialect.identifier_preparer.quote_schema(settings.db_schema)
+    connection.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {schema}.book_author_stats ("
+            "added_by BIGINT NOT NULL, "
+            "author VARCHAR(100) NOT NULL, "
+            "book_count BIGINT NOT NULL, "
+            "total_price FLOAT NOT NULL, "
+            "PRIMARY KEY (added_by, author))"
+        )
+    )
+    # applies the change of one books row to the summary, live rows only
+    connection.execute(
+        text(
+            f"""
+            CREATE OR REPLACE FUNCTION {schema}.book_author_stats_apply()
+            RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    IF NOT OLD.is_deleted THEN
+                        UPDATE {schema}.book_author_stats
+                        SET book_count = book_count - 1,
+                            total_price = total_price - COALESCE(OLD.price, 0)
+                        WHERE added_by = OLD.added_by
+                            AND author = COALESCE(OLD.author, '');
+                        DELETE FROM {schema}.book_author_stats
+                        WHERE added_by = OLD.added_by
+                            AND author = COALESCE(OLD.author, '')
+                            AND book_count <= 0;
+                    END IF;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    IF NOT NEW.is_deleted THEN
+                        INSERT INTO {schema}.book_author_stats AS stats
+                            (added_by, author, book_count, total_price)
+                        VALUES
+                            (NEW.added_by, COALESCE(NEW.author, ''), 1, COALESCE(NEW.price, 0))
+                        ON CONFLICT (added_by, author) DO UPDATE
+                        SET book_count = stats.book_count + 1,
+                            total_price = stats.total_price + EXCLUDED.total_price;
+                    END IF;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+    )
+    # no writes to books between the backfill and the trigger taking over
+    connection.execute(text(f"LOCK TABLE {schema}.books IN SHARE ROW EXCLUSIVE MODE"))
+    connection.execute(
+        text(f"DROP TRIGGER IF EXISTS book_author_stats_trigger ON {schema}.books")
+    )
+    connection.execute(
+        text(
+            "CREATE TRIGGER book_author_stats_trigger "
+            "AFTER INSERT OR DELETE OR UPDATE OF added_by, author, price, is_deleted "
+            f"ON {schema}.books FOR EACH ROW "
+            f"EXECUTE PROCEDURE {schema}.book_author_stats_apply()"
+        )
+    )
+    connection.execute(text(f"TRUNCATE {schema}.book_author_stats"))
+    connection.execute(
+        text(
+            f"INSERT INTO {schema}.book_author_stats "
+            "(added_by, author, book_count, total_price) "
+            "SELECT added_by, COALESCE(author, ''), COUNT(*), COALESCE(SUM(price), 0) "
+            f"FROM {schema}.books WHERE NOT is_deleted "
+            "GROUP BY added_by, COALESCE(author, '')"
+        )
+    )
@@ -0,0 +1,34 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from backend.app.core.config import settings
+
+VERSION = 4
+DESCRIPTION = "lookup indexes of version 2 as partial indexes over live rows"
+
+# version 2 used to build full indexes. On databases migrated with that version this
+# creates the partial indexes and drops the full ones, elsewhere it does nothing.
+INDEXES = [
+    (
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_users_email_live "
+        "ON {schema}.users (email) WHERE NOT is_deleted",
+        "ux_users_email",
+    ),
+    (
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_books_name_live "
+        "ON {schema}.books (name) WHERE NOT is_deleted",
+        "ux_books_name",
+    ),
+    (
+        "CREATE INDEX IF NOT EXISTS ix_books_live_added_by_created_at_id "
+        "ON {schema}.books (added_by, created_at, id) WHERE NOT is_deleted",
+        "ix_books_added_by_created_at_id",
+    ),
+]
+
+
+def upgrade(connection: Connection) -> None:
+    schema = connection.dialect.identifier_preparer.quote_schema(settings.db_schema)
+    for create_index, replaced_index in INDEXES:
+        connection.execute(text(create_index.format(schema=schema)))
+        connection.execute(text(f"DROP INDEX IF EXISTS {schema}.{replaced_index}"))
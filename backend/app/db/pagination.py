@@ -0,0 +1,37 @@
+import base64
+import json
+from datetime import datetime
+from typing import Generic, List, Optional, Tuple, TypeVar
+
+from pydantic.generics import GenericModel
+
+T = TypeVar("T")
+
+
+class Page(GenericModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    Encode the keyset position of a row into an opaque cursor token
+    @return: url safe cursor string
+    """
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor token produced by encode_cursor
+    Raises ValueError if the token is malformed
+    @return: (created_at, id) keyset position
+    """
+    try:
+        created_at, row_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii"))
+        )
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
@@ -0,0 +1,176 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Union
+
+from loguru import logger
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+@dataclass
+class CheckoutStats:
+    """
+    Connection checkouts of a pool, the wait includes pre-ping and opening new connections
+    """
+
+    checkouts: int = 0
+    timeouts: int = 0
+    wait: float = 0.0
+    max_wait: float = 0.0
+    peak_overflow: int = 0
+
+    def record(self, wait: float, overflow: int, timed_out: bool = False) -> None:
+        self.checkouts += 1
+        self.timeouts += int(timed_out)
+        self.wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.peak_overflow = max(self.peak_overflow, overflow)
+
+    @property
+    def avg_wait(self) -> float:
+        return self.wait / self.checkouts if self.checkouts else 0.0
+
+
+class _InstrumentedPool:
+    """
+    Records the time spent in every checkout, in total and since the auto-tuner last looked
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = CheckoutStats()
+        self.window = CheckoutStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        # other errors, e.g. failing to connect while the database is down, are not
+        # recorded, they are no sign of a busy pool
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self._record(time.perf_counter() - started, timed_out=True)
+            raise
+        self._record(time.perf_counter() - started)
+        return connection
+
+    def _record(self, wait: float, timed_out: bool = False) -> None:
+        overflow = max(self.overflow(), 0)
+        self.stats.record(wait, overflow, timed_out)
+        self.window.record(wait, overflow, timed_out)
+
+    def take_window(self) -> CheckoutStats:
+        window, self.window = self.window, CheckoutStats()
+        return window
+
+    def set_max_overflow(self, max_overflow: int) -> None:
+        # read by QueuePool on every checkout, takes effect right away
+        self._max_overflow = max_overflow
+
+    def status_dict(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.stats.checkouts,
+            "checkout_timeouts": self.stats.timeouts,
+            "avg_checkout_wait_ms": round(self.stats.avg_wait * 1000, 3),
+            "max_checkout_wait_ms": round(self.stats.max_wait * 1000, 3),
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _sync_engine(engine: Union[Engine, AsyncEngine]) -> Engine:
+    return engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+
+
+async def warm_up_pool(engine: Union[Engine, AsyncEngine], connections: int) -> None:
+    """
+    Open `connections` connections up front and return them to the pool, so the first
+    requests after a start do not pay for connection setup
+    """
+    if isinstance(engine, AsyncEngine):
+        opened: List[AsyncConnection] = await asyncio.gather(
+            *(engine.connect().start() for _ in range(connections))
+        )
+        for connection in opened:
+            await connection.close()
+    else:
+        opened = [engine.connect() for _ in range(connections)]
+        for connection in opened:
+            connection.close()
+    logger.info("Warmed up {0} pooled connection(s) of {1}", connections, engine.url)
+
+
+def pool_status(engines: List[Union[Engine, AsyncEngine]]) -> Dict[str, dict]:
+    """
+    @return: pool statistics keyed by the (password masked) url of each engine
+    """
+    status = {}
+    for engine in engines:
+        pool = _sync_engine(engine).pool
+        if isinstance(pool, _InstrumentedPool):
+            status[repr(engine.url)] = pool.status_dict()
+    return status
+
+
+class PoolAutoTuner:
+    """
+    Grows the overflow of a pool when checkouts wait longer than `wait_threshold`
+    seconds on average, and shrinks it again while the extra connections go unused.
+    The overflow stays within 0 and `max_overflow`.
+    """
+
+    def __init__(
+        self,
+        engines: List[Union[Engine, AsyncEngine]],
+        max_overflow: int,
+        interval: float,
+        wait_threshold: float,
+        step: int,
+    ) -> None:
+        self.engines = engines
+        self.max_overflow = max_overflow
+        self.interval = interval
+        self.wait_threshold = wait_threshold
+        self.step = step
+
+    def tune(self) -> None:
+        for engine in self.engines:
+            # looked up every time, disposing an engine recreates its pool
+            pool = _sync_engine(engine).pool
+            if not isinstance(pool, _InstrumentedPool):
+                continue
+            window = pool.take_window()
+            current = pool._max_overflow
+            if window.avg_wait > self.wait_threshold or window.timeouts:
+                target = min(current + self.step, self.max_overflow)
+            elif window.peak_overflow + self.step <= current:
+                target = max(current - self.step, 0)
+            else:
+                continue
+            if target != current:
+                logger.info(
+                    "Pool of {0}: max_overflow {1} -> {2} (avg checkout wait {3:.1f} ms)",
+                    repr(engine.url),
+                    current,
+                    target,
+                    window.avg_wait * 1000,
+                )
+                pool.set_max_overflow(target)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.tune()
@@ -0,0 +1,122 @@
+import itertools
+import time
+from typing import Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.query import FromStatement
+
+# execution option marking a statement as safe to run on a read replica
+READ_REPLICA_OPTION = "read_replica"
+PIN_PRIMARY_KEY = "pin_primary"
+REPLICA_KEY = "replica"
+
+
+class ReplicaSet:
+    """
+    Round-robin over read replica engines.
+    A replica failing to connect or dropping its connection is ejected for `ejection_seconds`
+    and then tried again.
+    """
+
+    def __init__(self, engines: List[Engine], ejection_seconds: float):
+        self.engines = engines
+        self.ejection_seconds = ejection_seconds
+        self._ejected_until: Dict[Engine, float] = {}
+        self._counter = itertools.count()
+        for engine in engines:
+            event.listen(engine, "do_connect", self._connect_or_eject(engine))
+            event.listen(engine, "handle_error", self._on_error)
+
+    def _connect_or_eject(self, engine: Engine):
+        def connect(dialect, connection_record, cargs, cparams):
+            try:
+                return dialect.connect(*cargs, **cparams)
+            except Exception:
+                self.eject(engine)
+                raise
+
+        return connect
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect:
+            self.eject(context.engine)
+
+    def eject(self, engine: Engine) -> None:
+        logger.warning(
+            "Ejecting read replica {0} for {1}s",
+            repr(engine.url),
+            self.ejection_seconds,
+        )
+        self._ejected_until[engine] = time.monotonic() + self.ejection_seconds
+
+    def is_ejected(self, engine: Engine) -> bool:
+        return self._ejected_until.get(engine, 0) > time.monotonic()
+
+    def choose(self) -> Optional[Engine]:
+        """
+        Pick the next healthy replica
+        @return: Engine or None if every replica is ejected
+        """
+        now = time.monotonic()
+        start = next(self._counter)
+        for offset in range(len(self.engines)):
+            engine = self.engines[(start + offset) % len(self.engines)]
+            if self._ejected_until.get(engine, 0) <= now:
+                return engine
+        return None
+
+
+def _is_dml(clause) -> bool:
+    # ORM statements over INSERT ... RETURNING, select(model).from_statement(insert(...))
+    if isinstance(clause, FromStatement):
+        clause = clause.element
+    return clause.is_dml
+
+
+class RoutingSession(Session):
+    """
+    Session sending statements marked with READ_REPLICA_OPTION to a read replica and everything
+    else to the primary. All reads of a session go to the same replica, and once the session
+    writes, its reads stay on the primary.
+    """
+
+    def __init__(self, replicas: ReplicaSet = None, **kwargs):
+        super().__init__(**kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or (clause is not None and _is_dml(clause)):
+            pin_to_primary(self)
+        elif (
+            self.replicas is not None
+            and clause is not None
+            and clause._execution_options.get(READ_REPLICA_OPTION)
+            and not self.info.get(PIN_PRIMARY_KEY)
+        ):
+            replica = self.info.get(REPLICA_KEY)
+            if replica is None:
+                replica = self.info[REPLICA_KEY] = self.replicas.choose()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+def pin_to_primary(session: Session) -> None:
+    """
+    Send every further read of the session to the primary, e.g. to read back a write
+    """
+    session.info[PIN_PRIMARY_KEY] = True
+
+
+def replica_ejected(session) -> bool:
+    """
+    @return: whether the replica serving the reads of `session` has been ejected,
+    i.e. it failed to connect or dropped its connection
+    """
+    replica = session.info.get(REPLICA_KEY)
+    # the routing session of an AsyncSession is its sync_session
+    replicas = getattr(getattr(session, "sync_session", session), "replicas", None)
+    return replica is not None and replicas is not None and replicas.is_ejected(replica)
@@ -0,0 +1,122 @@
+import asyncio
+from typing import Dict, Optional
+
+from loguru import logger
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.elements import TextClause
+from starlette.requests import Request
+
+from backend.app.core.config import settings
+
+# statement timeout of the session when it differs from db_statement_timeout_ms
+STATEMENT_TIMEOUT_KEY = "statement_timeout"
+_CONNECTIONS_KEY = "connections"
+# unpooled engines sending the cancel requests of each engine
+_cancel_engines: Dict[Engine, AsyncEngine] = {}
+
+
+def statement_timeout_connect_args(is_driver_async: bool) -> dict:
+    """
+    Connect arguments making db_statement_timeout_ms the default of every connection,
+    so requests using the default do not pay an extra round trip
+    """
+    timeout_ms = settings.db_statement_timeout_ms
+    if is_driver_async:
+        return {"server_settings": {"statement_timeout": str(timeout_ms)}}
+    return {"options": f"-c statement_timeout={timeout_ms}"}
+
+
+def route_statement_timeout(request: Request) -> Optional[int]:
+    """
+    @return: the timeout configured in db_route_statement_timeouts_ms for the route, if any
+    """
+    route = request.scope.get("route")
+    if route is None:
+        return None
+    return settings.db_route_statement_timeouts_ms.get(f"{request.method} {route.path}")
+
+
+def statement_timeout_sql(timeout_ms: int) -> TextClause:
+    return text(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def _after_begin(session, transaction, connection) -> None:
+    # captured up front, a cancelled asyncpg statement invalidates the connection
+    driver_connection = connection.connection.driver_connection
+    if connection.dialect.is_async:
+        backend_pid = driver_connection.get_server_pid()
+    else:
+        backend_pid = driver_connection.get_backend_pid()
+    session.info.setdefault(_CONNECTIONS_KEY, set()).add(
+        (connection.engine, driver_connection, backend_pid)
+    )
+    timeout_ms = session.info.get(STATEMENT_TIMEOUT_KEY)
+    if timeout_ms is not None:
+        connection.execute(statement_timeout_sql(timeout_ms))
+
+
+def _after_transaction_end(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_CONNECTIONS_KEY, None)
+
+
+def register_statement_timeouts() -> None:
+    """
+    Apply the statement timeout of a session to every transaction it begins and keep
+    track of its connections, so their running statements can be cancelled
+    """
+    if not event.contains(Session, "after_begin", _after_begin):
+        event.listen(Session, "after_begin", _after_begin)
+        event.listen(Session, "after_transaction_end", _after_transaction_end)
+
+
+def cancel_statements(session: Session) -> None:
+    """
+    Cancel the statements running on the connections of a sync-driver session
+    """
+    for _, driver_connection, _ in list(session.info.get(_CONNECTIONS_KEY, ())):
+        try:
+            driver_connection.cancel()
+        except Exception as e:
+            logger.warning("Could not cancel statement: {0}", e)
+
+
+def _cancel_engine(engine: Engine) -> AsyncEngine:
+    """
+    Engine opening a connection of its own for every cancel request, the pool of `engine`
+    may be exhausted by the very requests being cancelled
+    """
+    if engine not in _cancel_engines:
+        _cancel_engines[engine] = create_async_engine(
+            engine.url,
+            poolclass=NullPool,
+            connect_args={"timeout": settings.db_cancel_timeout_ms / 1000},
+        )
+    return _cancel_engines[engine]
+
+
+async def _cancel_backend(engine: Engine, backend_pid: int) -> None:
+    async with _cancel_engine(engine).connect() as cancel_connection:
+        await cancel_connection.execute(
+            text("SELECT pg_cancel_backend(:pid)"), {"pid": backend_pid}
+        )
+
+
+async def cancel_async_statements(session: AsyncSession) -> None:
+    """
+    Cancel the statements running on the connections of an asyncpg session, cancelling the
+    awaiting task leaves them running on the server.
+    Each cancel request gives up after db_cancel_timeout_ms.
+    """
+    for engine, _, backend_pid in list(session.info.get(_CONNECTIONS_KEY, ())):
+        try:
+            await asyncio.wait_for(
+                _cancel_backend(engine, backend_pid),
+                timeout=settings.db_cancel_timeout_ms / 1000,
+            )
+        except Exception as e:
+            logger.warning("Could not cancel statement: {0!r}", e)
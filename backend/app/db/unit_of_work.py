@@ -0,0 +1,103 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Union
+
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import Response
+
+from backend.app.db.executor import run_in_db_executor
+
+UNIT_OF_WORK_KEY = "unit_of_work"
+AFTER_COMMIT_KEY = "after_commit"
+
+
+async def call_session(
+    session: Union[Session, AsyncSession], method: str, *args, **kwargs
+) -> Any:
+    """
+    Call a session method, awaiting it on async sessions and running it on the
+    database executor for sync sessions
+    """
+    if isinstance(session, AsyncSession):
+        return await getattr(session, method)(*args, **kwargs)
+    return await run_in_db_executor(session, getattr(session, method), *args, **kwargs)
+
+
+async def commit_or_flush(session: Union[Session, AsyncSession]) -> None:
+    """
+    Commit the session, or only flush it when it belongs to a unit of work,
+    whose changes are committed once at the end of the request
+    """
+    if session.info.get(UNIT_OF_WORK_KEY):
+        await call_session(session, "flush")
+    else:
+        await call_session(session, "commit")
+
+
+async def after_commit(
+    session: Union[Session, AsyncSession], callback: Callable[[], Awaitable]
+) -> None:
+    """
+    Run `callback` once the changes staged on `session` are committed, right away when the
+    session is not a unit of work. Dropped when the unit of work is rolled back.
+    """
+    if session.info.get(UNIT_OF_WORK_KEY):
+        session.info.setdefault(AFTER_COMMIT_KEY, []).append(callback)
+    else:
+        await callback()
+
+
+async def _commit(session: Union[Session, AsyncSession]) -> None:
+    await call_session(session, "commit")
+    for callback in session.info.pop(AFTER_COMMIT_KEY, []):
+        await callback()
+
+
+@asynccontextmanager
+async def unit_of_work(
+    session: Union[Session, AsyncSession], request: Request
+) -> AsyncIterator[None]:
+    """
+    Make `session` a unit of work for the request: helpers stage their changes, which are
+    committed once when the request succeeds and rolled back when it raises.
+    Does nothing when the db_unit_of_work setting is off.
+    """
+    if not request.app.state.settings.db_unit_of_work:
+        yield
+        return
+
+    session.info[UNIT_OF_WORK_KEY] = True
+    request.state.db_session = session
+    try:
+        yield
+    except Exception:
+        session.info.pop(AFTER_COMMIT_KEY, None)
+        await call_session(session, "rollback")
+        raise
+    # no-op when UnitOfWorkRoute already committed before sending the response
+    await _commit(session)
+
+
+async def commit_unit_of_work(request: Request) -> None:
+    session = getattr(request.state, "db_session", None)
+    if session is not None:
+        await _commit(session)
+
+
+class UnitOfWorkRoute(APIRoute):
+    """
+    Commits the unit of work of the request before the response is sent, so a failing
+    commit turns into an error response instead of a success for changes that were lost
+    """
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def unit_of_work_route_handler(request: Request) -> Response:
+            response = await route_handler(request)
+            await commit_unit_of_work(request)
+            return response
+
+        return unit_of_work_route_handler
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from itertools import groupby
+from typing import Callable, List, Optional, Tuple, Union
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.app.db.bulk import (
+    assign_primary_keys,
+    in_values_order,
+    insert_returning_statement,
+    insert_values,
+)
+from backend.app.db.executor import DBExecutor, db_executor_slot
+from backend.app.db.unit_of_work import call_session
+
+WRITE_BEHIND_KEY = "write_behind"
+
+_Pending = Tuple[object, asyncio.Future]
+
+
+def _batch_key(pending: _Pending):
+    instance, _ = pending
+    return type(instance).__name__, tuple(insert_values(instance))
+
+
+class WriteBehindWriter:
+    """
+    Group commit for single-row inserts: objects submitted by concurrent requests are
+    collected for up to `max_delay` seconds or `max_rows` objects and written with one
+    multi-row INSERT ... RETURNING per table in a single transaction.
+    The inserts are committed by the writer, outside the unit of work of the request.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Union[Session, AsyncSession]],
+        max_rows: int,
+        max_delay: float,
+        executor: Optional[DBExecutor] = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.executor = executor
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._queue: "asyncio.Queue[Optional[_Pending]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Write what is still queued and stop the writer
+        """
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+
+    async def submit(self, instance):
+        """
+        Queue `instance` for insertion and wait until its batch is committed
+        @return: the inserted row as a new object of the same model
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((instance, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[_Pending]) -> None:
+        started = time.perf_counter()
+        try:
+            await self._write(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch, e)
+                return
+            # write the rows one by one so only the callers of the failing rows get the error
+            logger.warning(
+                "Write-behind batch of {0} rows failed ({1}), retrying row by row",
+                len(batch),
+                type(e).__name__,
+            )
+            for pending in batch:
+                try:
+                    await self._write([pending])
+                except Exception as row_error:
+                    self._fail([pending], row_error)
+            return
+        logger.debug(
+            "Write-behind flushed {0} rows ({1:.3f}s)",
+            len(batch),
+            time.perf_counter() - started,
+        )
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        inserted = []
+        async with db_executor_slot(self.executor):
+            session = self.session_factory()
+            try:
+                for _, group in groupby(sorted(batch, key=_batch_key), key=_batch_key):
+                    group = list(group)
+                    model = type(group[0][0])
+                    values = [insert_values(instance) for instance, _ in group]
+                    # rows are matched to their callers by primary key
+                    await assign_primary_keys(session, model, values)
+                    result = await call_session(
+                        session, "execute", insert_returning_statement(model, values)
+                    )
+                    rows = in_values_order(model, values, result.scalars().all())
+                    inserted.extend(zip(group, rows))
+                await call_session(session, "commit")
+            except Exception:
+                await call_session(session, "rollback")
+                raise
+            finally:
+                await call_session(session, "close")
+        for (_, future), row in inserted:
+            if not future.done():
+                future.set_result(row)
+
+    @staticmethod
+    def _fail(batch: List[_Pending], error: Exception) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
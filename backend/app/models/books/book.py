@@ -1,4 +1,6 @@
-from sqlalchemy import Column, VARCHAR, FLOAT, BigInteger, ForeignKey
+from typing import Optional
+
+from sqlalchemy import Column, VARCHAR, FLOAT, BigInteger, ForeignKey, Index, text
 from sqlmodel import SQLModel, Field, Relationship
 from backend.app.core.config import settings
 
@@ -14,7 +16,24 @@ class BookIn(SQLModel):
 
 class Book(BookIn, CommonModelAttributes, table=True):
     __tablename__ = "books"
-    __table_args__ = {"schema": settings.db_schema}
+    __table_args__ = (
+        # partial indexes hold live rows only, soft deleted ones are not looked up
+        Index(
+            "ux_books_name_live",
+            "name",
+            unique=True,
+            postgresql_where=text("NOT is_deleted"),
+        ),
+        # backs keyset pagination of a user's books on (created_at, id)
+        Index(
+            "ix_books_live_added_by_created_at_id",
+            "added_by",
+            "created_at",
+            "id",
+            postgresql_where=text("NOT is_deleted"),
+        ),
+        {"schema": settings.db_schema},
+    )
     id: int = Field(sa_column=Column(BigInteger, primary_key=True, index=True))
     added_by: int = Field(
         sa_column=Column(
@@ -29,9 +48,31 @@ class Book(BookIn, CommonModelAttributes, table=True):
     user: "User" = Relationship(
         sa_relationship_kwargs={
             "primaryjoin": "Book.added_by==User.id",
-            "lazy": "joined",
+            # not loaded eagerly, queries opt in through get_from_db loader options
+            "lazy": "select",
             "uselist": True,
             "viewonly": True,
             # "overlaps": "books",
         }
     )
+
+
+class BookAuthorStats(SQLModel, table=True):
+    # summary of the live books per (user, author), kept current by a trigger on books
+    __tablename__ = "book_author_stats"
+    __table_args__ = {"schema": settings.db_schema}
+    added_by: int = Field(sa_column=Column(BigInteger, primary_key=True))
+    author: str = Field(sa_column=Column(VARCHAR(100), primary_key=True))
+    book_count: int = Field(sa_column=Column(BigInteger, nullable=False))
+    total_price: float = Field(sa_column=Column(FLOAT, nullable=False))
+
+
+class BookStats(SQLModel):
+    book_count: int
+    total_price: float
+    average_price: Optional[float] = None
+
+
+class AuthorBookCount(SQLModel):
+    author: str
+    book_count: int
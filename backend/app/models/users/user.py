@@ -1,7 +1,7 @@
 from typing import Optional, List
 
 from pydantic import EmailStr, validator, root_validator
-from sqlalchemy import Column, VARCHAR, BigInteger, Text
+from sqlalchemy import Column, VARCHAR, BigInteger, Index, Text, text
 from sqlalchemy.dialects.postgresql import BYTEA
 from sqlmodel import Field, SQLModel, Relationship
 
@@ -35,14 +35,24 @@ class UserIn(BaseUser):
 
 class User(BaseUser, CommonModelAttributes, table=True):
     __tablename__ = "users"
-    __table_args__ = {"schema": settings.db_schema}
+    __table_args__ = (
+        # partial indexes hold live rows only, soft deleted ones are not looked up
+        Index(
+            "ux_users_email_live",
+            "email",
+            unique=True,
+            postgresql_where=text("NOT is_deleted"),
+        ),
+        {"schema": settings.db_schema},
+    )
     id: int = Field(sa_column=Column(BigInteger, primary_key=True, index=True))
     password_hash: bytes = Field(sa_column=Column(BYTEA(255), nullable=False))
 
     books: Optional[List["Book"]] = Relationship(  # noqa
         sa_relationship_kwargs={
             "primaryjoin": "User.id==Book.added_by",
-            "lazy": "joined",
+            # not loaded eagerly, queries opt in through get_from_db loader options
+            "lazy": "select",
             "uselist": True,
             # "overlaps": "books",
         }
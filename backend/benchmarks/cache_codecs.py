@@ -0,0 +1,118 @@
+"""
+Benchmark for the cache codecs.
+
+Encodes and decodes representative cached payloads (a book, a user and a page of books, as
+the read-through cache stores them) with every installed serializer and compressor, and
+reports the time per encode / decode and the bytes stored in Redis. The first row of each
+payload is the pretty-printed JSON the cache stored before the codecs existed.
+
+usage: python -m backend.benchmarks.cache_codecs [--iterations 2000] [--page-size 50]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from backend.app.cache.codecs import (
+    COMPRESSORS,
+    SERIALIZERS,
+    CacheCodec,
+    DateTimeEncoder,
+)
+
+
+def book(index: int) -> dict:
+    created_at = datetime(2023, 10, 1) + timedelta(minutes=index)
+    return {
+        "id": index,
+        "name": f"The Book Number {index}",
+        "price": 10.5 + index,
+        "author": f"Author {index % 7}",
+        "added_by": 1,
+        "created_at": created_at.isoformat(),
+        "updated_at": created_at.isoformat(),
+        "is_active": True,
+        "is_deleted": False,
+        "deleted_at": None,
+    }
+
+
+def payloads(page_size: int) -> Dict[str, object]:
+    user = {
+        "id": 1,
+        "first_name": "Basil",
+        "last_name": "T T",
+        "email": "basil.tt@hpe.com",
+        "phone": "8547948528",
+        "created_at": datetime(2023, 10, 1).isoformat(),
+        "updated_at": datetime(2023, 10, 1).isoformat(),
+        "is_active": True,
+        "is_deleted": False,
+        "deleted_at": None,
+    }
+    page = {
+        "items": [book(index) for index in range(page_size)],
+        "next_cursor": "WyIyMDIzLTEwLTAxVDAwOjAwOjAwIiwgNTBd",
+    }
+    return {"book": book(1), "user": user, f"page of {page_size} books": page}
+
+
+def timed(function: Callable, argument, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function(argument)
+    return (time.perf_counter() - started) / iterations
+
+
+def report(label: str, encode: Callable, decode: Callable, value, iterations: int):
+    data = encode(value)
+    print(
+        f"  {label:<24} "
+        f"encode={timed(encode, value, iterations) * 1e6:8.2f}us "
+        f"decode={timed(decode, data, iterations) * 1e6:8.2f}us "
+        f"bytes={len(data):7d}"
+    )
+
+
+def codecs(threshold: int) -> Dict[str, CacheCodec]:
+    available = {}
+    compressions: list = [None, *COMPRESSORS]
+    for serializer in SERIALIZERS:
+        for compression in compressions:
+            label = serializer if compression is None else f"{serializer}+{compression}"
+            try:
+                available[label] = CacheCodec(serializer, compression, threshold)
+            except ImportError as e:
+                print(f"skipping {label}: {e}")
+    return available
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument(
+        "--compression-threshold",
+        type=int,
+        default=0,
+        help="compress payloads of at least this many bytes",
+    )
+    args = parser.parse_args()
+
+    available = codecs(args.compression_threshold)
+    for name, value in payloads(args.page_size).items():
+        print(name)
+        report(
+            "legacy json indent=4",
+            lambda v: json.dumps(v, indent=4, cls=DateTimeEncoder),
+            json.loads,
+            value,
+            args.iterations,
+        )
+        for label, codec in available.items():
+            report(label, codec.encode, codec.decode, value, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
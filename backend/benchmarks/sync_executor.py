@@ -0,0 +1,150 @@
+"""
+Benchmark for the sync-driver executor mode.
+
+Simulates concurrent requests against a sync database driver where a share of the requests
+run a slow query and the rest never touch the database, then reports latency percentiles
+with the session calls made inline on the event loop and on the database executor.
+
+usage: python -m backend.benchmarks.sync_executor [--database-url sqlite:///bench.db]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from backend.app.core.config import get_app_settings
+from backend.app.db.executor import (
+    DB_EXECUTOR_KEY,
+    create_db_executor,
+    db_executor_slot,
+    run_in_db_executor,
+)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_engine(database_url: str):
+    if database_url.startswith("sqlite"):
+        engine = create_engine(
+            database_url,
+            poolclass=QueuePool,
+            connect_args={"check_same_thread": False},
+            future=True,
+        )
+
+        # sqlite has no pg_sleep, register one so the same statement works on both
+        @event.listens_for(engine, "connect")
+        def register_sleep(dbapi_connection, _):
+            dbapi_connection.create_function("pg_sleep", 1, time.sleep)
+
+        return engine
+    return create_engine(database_url, poolclass=QueuePool, future=True)
+
+
+async def simulated_request(
+    session_factory, executor, query_delay: float, hits_db: bool
+) -> float:
+    started = time.perf_counter()
+    if hits_db:
+        async with db_executor_slot(executor):
+            session = session_factory()
+            try:
+                await run_in_db_executor(
+                    session,
+                    session.execute,
+                    text("SELECT pg_sleep(:delay)"),
+                    {"delay": query_delay},
+                )
+            finally:
+                await run_in_db_executor(session, session.close)
+    else:
+        await asyncio.sleep(0)
+    return time.perf_counter() - started
+
+
+async def run_load(
+    session_factory,
+    executor,
+    requests: int,
+    concurrency: int,
+    query_delay: float,
+    db_ratio: int,
+) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(index: int) -> float:
+        async with semaphore:
+            return await simulated_request(
+                session_factory,
+                executor,
+                query_delay,
+                hits_db=index % db_ratio == 0,
+            )
+
+    return await asyncio.gather(*(limited(index) for index in range(requests)))
+
+
+def report(label: str, latencies: List[float], elapsed: float) -> None:
+    print(
+        f"{label:<12} requests={len(latencies)} "
+        f"p50={percentile(latencies, 50) * 1000:8.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:8.2f}ms "
+        f"mean={statistics.mean(latencies) * 1000:8.2f}ms "
+        f"throughput={len(latencies) / elapsed:8.1f}/s"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--query-delay", type=float, default=0.01)
+    parser.add_argument(
+        "--db-ratio", type=int, default=5, help="one request in N runs a query"
+    )
+    args = parser.parse_args()
+
+    settings = get_app_settings()
+    database_url = args.database_url or "sqlite:///" + os.path.join(
+        tempfile.gettempdir(), "sync_executor_bench.db"
+    )
+    engine = build_engine(database_url)
+    executor = create_db_executor(settings.copy(update={"db_sync_executor": True}))
+    modes = {
+        "inline": (sessionmaker(engine, future=True), None),
+        "executor": (
+            sessionmaker(engine, future=True, info={DB_EXECUTOR_KEY: executor}),
+            executor,
+        ),
+    }
+    try:
+        for label, (session_factory, mode_executor) in modes.items():
+            started = time.perf_counter()
+            latencies = await run_load(
+                session_factory,
+                mode_executor,
+                args.requests,
+                args.concurrency,
+                args.query_delay,
+                args.db_ratio,
+            )
+            report(label, latencies, time.perf_counter() - started)
+    finally:
+        executor.shutdown(wait=True)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -12,6 +12,10 @@ from backend.app.api.routes.api import router as api_router
 from backend.app.api.utils.hpe_oauth import HpaOauth
 from backend.app.core.config import get_app_settings
 from backend.app.core.events import create_start_app_handler, create_stop_app_handler
+from backend.app.core.middleware import (
+    CancelOnDisconnectMiddleware,
+    ServerTimingMiddleware,
+)
 from backend.app.errors.http_error import http_error_handler
 from backend.app.errors.validation_error import http422_error_handler
 
@@ -38,6 +42,10 @@ def get_application() -> FastAPI:
         allow_headers=["*"],
     )
     application.add_middleware(SessionMiddleware, secret_key=settings.secret_key)
+    if settings.db_query_instrumentation:
+        application.add_middleware(ServerTimingMiddleware)
+    if settings.cancel_on_disconnect:
+        application.add_middleware(CancelOnDisconnectMiddleware)
 
     application.add_event_handler(
         "startup",
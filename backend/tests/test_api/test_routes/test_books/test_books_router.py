@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from httpx import AsyncClient
+
+OWNER = {
+    "email": "book.owner@hpe.com",
+    "first_name": "Book",
+    "last_name": "Owner",
+    "password": "My!Password777",
+    "repeat_password": "My!Password777",
+    "phone": "8547948529",
+}
+BOOK_NAMES = ["Book One", "Book Two", "Book Three"]
+
+
+@pytest.mark.run(order=1)
+#  Test for adding books
+async def test_add_books(async_client: AsyncClient) -> None:
+    response = await async_client.post("/api/users/sign-up", json=OWNER)
+    assert response.status_code == 201
+    for name in BOOK_NAMES:
+        response = await async_client.post(
+            "/api/books/add-book",
+            params={"added_by": OWNER["email"]},
+            json={"name": name, "price": 10.5, "author": "Author"},
+        )
+        assert response.status_code == 200
+        assert response.json().get("name") == name
+
+
+@pytest.mark.run(order=2)
+#  Test for adding an already existing book
+async def test_add_duplicate_book(async_client: AsyncClient) -> None:
+    response = await async_client.post(
+        "/api/books/add-book",
+        params={"added_by": OWNER["email"]},
+        json={"name": BOOK_NAMES[0], "price": 1.0, "author": "Someone Else"},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.run(order=3)
+#  Test for paging through the books of a user
+async def test_get_user_books_pages(async_client: AsyncClient) -> None:
+    names, cursor = [], None
+    for _ in BOOK_NAMES:
+        params = {"email": OWNER["email"], "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await async_client.get("/api/books/get-user-books", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        names.extend(book.get("name") for book in page.get("items"))
+        cursor = page.get("next_cursor")
+        if cursor is None:
+            break
+    assert names == BOOK_NAMES
+
+
+@pytest.mark.run(order=4)
+#  Test for an invalid cursor
+async def test_get_user_books_invalid_cursor(async_client: AsyncClient) -> None:
+    response = await async_client.get(
+        "/api/books/get-user-books",
+        params={"email": OWNER["email"], "cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.run(order=5)
+#  Test for streaming the books of a user as NDJSON
+async def test_stream_user_books(async_client: AsyncClient) -> None:
+    response = await async_client.get(
+        "/api/books/stream-user-books", params={"email": OWNER["email"]}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    books = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(book.get("name") for book in books) == sorted(BOOK_NAMES)
+
+
+@pytest.mark.run(order=6)
+#  Test for the book statistics of a user
+async def test_get_book_stats(async_client: AsyncClient) -> None:
+    response = await async_client.get(
+        "/api/books/stats", params={"email": OWNER["email"]}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "book_count": len(BOOK_NAMES),
+        "total_price": 10.5 * len(BOOK_NAMES),
+        "average_price": 10.5,
+    }
+
+
+@pytest.mark.run(order=7)
+#  Test for the book counts per author
+async def test_get_author_book_counts(async_client: AsyncClient) -> None:
+    response = await async_client.get("/api/books/author-counts")
+    assert response.status_code == 200
+    assert {"author": "Author", "book_count": len(BOOK_NAMES)} in response.json()
+
+
+@pytest.mark.run(order=8)
+#  Test for answering a conditional get of an unchanged book with 304
+async def test_get_book_not_modified(async_client: AsyncClient) -> None:
+    params = {"book_name": BOOK_NAMES[0]}
+    response = await async_client.get("/api/books/get-book", params=params)
+    assert response.status_code == 200
+    etag = response.headers.get("etag")
+    assert etag and response.headers.get("last-modified")
+
+    response = await async_client.get(
+        "/api/books/get-book", params=params, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers.get("etag") == etag
+    assert not response.content
+
+    response = await async_client.get(
+        "/api/books/get-book", params=params, headers={"If-None-Match": '"stale"'}
+    )
+    assert response.status_code == 200
@@ -0,0 +1,39 @@
+from httpx import AsyncClient
+
+
+#  Test for the database statement metrics of a route
+async def test_db_metrics(async_client: AsyncClient) -> None:
+    response = await async_client.get(
+        "/api/books/get-book", params={"book_name": "No Such Book"}
+    )
+    assert response.status_code == 404
+    assert response.headers.get("server-timing").startswith("db;dur=")
+
+    response = await async_client.get("/api/metrics/db")
+    assert response.status_code == 200
+    route_stats = response.json().get("GET /api/books/get-book")
+    assert route_stats.get("requests") >= 1
+    assert route_stats.get("statements") >= 1
+    assert route_stats.get("statement_timeouts") == 0
+
+
+#  Test for the connection pool metrics
+async def test_db_pool_metrics(async_client: AsyncClient) -> None:
+    response = await async_client.get("/api/metrics/db-pool")
+    assert response.status_code == 200
+    (pool,) = response.json().values()
+    assert pool.get("checked_in") >= 1
+    assert pool.get("checkouts") >= 1
+    assert "avg_checkout_wait_ms" in pool
+
+
+#  Test for the hit / miss counters of the cache tiers
+async def test_cache_metrics(async_client: AsyncClient) -> None:
+    response = await async_client.get("/api/metrics/cache")
+    assert response.status_code == 200
+    tiers = response.json()
+    assert tiers.get("l1").get("misses") >= 1
+    assert {"hits", "misses", "hit_ratio"} <= set(tiers.get("l2"))
+    book_stats = tiers.get("namespaces").get("book")
+    assert book_stats.get("misses") >= 1
+    assert "buckets" in book_stats.get("redis_latency_ms")
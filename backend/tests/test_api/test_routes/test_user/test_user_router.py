@@ -32,3 +32,20 @@ async def test_create_user(async_client: AsyncClient) -> None:
     assert response.json().get("first_name") == data.get("first_name")
     assert response.json().get("last_name") == data.get("last_name")
     assert response.json().get("phone") == data.get("phone")
+
+
+@pytest.mark.run(order=2)
+#  Test for creating an already existing user
+async def test_create_duplicate_user(async_client: AsyncClient) -> None:
+    data = {
+        "email": "basil.tt@hpe.com",
+        "first_name": "Basil",
+        "last_name": "T T",
+        "password": "My!Password777",
+        "repeat_password": "My!Password777",
+        "phone": "8547948528",
+    }
+    response = await async_client.post(
+        "/api/users/sign-up", follow_redirects=True, json=data
+    )
+    assert response.status_code == 400
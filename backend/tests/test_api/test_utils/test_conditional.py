@@ -0,0 +1,74 @@
+from starlette.requests import Request
+
+from backend.app.api.utils.conditional import conditional_response
+from backend.app.cache.validators import content_validators
+
+BOOK = {"id": 1, "name": "Book One", "updated_at": "2024-01-02T03:04:05"}
+LAST_MODIFIED = "Tue, 02 Jan 2024 03:04:05 GMT"
+
+
+def _request(**headers) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "headers": [
+                (name.replace("_", "-").encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+    )
+
+
+#  Test for the ETag and Last-Modified of objects and pages
+def test_content_validators() -> None:
+    validators = content_validators(BOOK)
+    assert validators.etag.startswith('"') and validators.etag.endswith('"')
+    assert validators.last_modified == LAST_MODIFIED
+    assert content_validators(dict(BOOK)) == validators
+    assert content_validators({**BOOK, "name": "Other"}).etag != validators.etag
+
+    # pages only get an ETag
+    page = {"items": [BOOK], "next_cursor": None}
+    assert content_validators(page).last_modified is None
+    assert content_validators([BOOK]).last_modified is None
+
+
+#  Test for answering If-None-Match
+def test_conditional_response_if_none_match() -> None:
+    etag = content_validators(BOOK).etag
+    response = conditional_response(_request(if_none_match=etag), BOOK)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert not response.body
+
+    # weak comparison and lists of tags
+    for if_none_match in (f"W/{etag}", f'"other", {etag}', "*"):
+        response = conditional_response(_request(if_none_match=if_none_match), BOOK)
+        assert response.status_code == 304
+
+    response = conditional_response(_request(if_none_match='"other"'), BOOK)
+    assert response.status_code == 200
+    assert response.headers["last-modified"] == LAST_MODIFIED
+
+
+#  Test for answering If-Modified-Since, ignored along If-None-Match
+def test_conditional_response_if_modified_since() -> None:
+    response = conditional_response(_request(if_modified_since=LAST_MODIFIED), BOOK)
+    assert response.status_code == 304
+
+    earlier = "Tue, 02 Jan 2024 03:04:04 GMT"
+    response = conditional_response(_request(if_modified_since=earlier), BOOK)
+    assert response.status_code == 200
+    response = conditional_response(_request(if_modified_since="not a date"), BOOK)
+    assert response.status_code == 200
+
+    response = conditional_response(
+        _request(if_none_match='"other"', if_modified_since=LAST_MODIFIED), BOOK
+    )
+    assert response.status_code == 200
+
+    # pages carry no Last-Modified to compare with
+    page = {"items": [BOOK], "next_cursor": None}
+    response = conditional_response(_request(if_modified_since=LAST_MODIFIED), page)
+    assert response.status_code == 200
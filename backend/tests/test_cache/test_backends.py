@@ -0,0 +1,97 @@
+import asyncio
+
+from backend.app.cache.backends import MemoryBackend
+
+
+#  Test for values expiring after ex / px
+async def test_memory_backend_expiry() -> None:
+    backend = MemoryBackend(max_keys=10)
+    await backend.set("short", "value", px=20)
+    await backend.set("long", "value", ex=60)
+    await backend.set("forever", b"value")
+    assert await backend.mget(["short", "long", "forever", "missing"]) == [
+        b"value",
+        b"value",
+        b"value",
+        None,
+    ]
+
+    await asyncio.sleep(0.05)
+    assert await backend.mget(["short", "long", "forever"]) == [
+        None,
+        b"value",
+        b"value",
+    ]
+    assert await backend.exists("short", "long", "forever") == 2
+
+
+#  Test for evicting the least recently used keys beyond max_keys
+async def test_memory_backend_lru_eviction() -> None:
+    backend = MemoryBackend(max_keys=2)
+    await backend.set("a", "1")
+    await backend.set("b", "2")
+    # reading "a" makes "b" the least recently used key
+    await backend.mget(["a"])
+    await backend.set("c", "3")
+    assert await backend.mget(["a", "b", "c"]) == [b"1", None, b"3"]
+
+
+#  Test for SET NX
+async def test_memory_backend_set_nx() -> None:
+    backend = MemoryBackend(max_keys=10)
+    assert await backend.set("lock", "first", px=20, nx=True)
+    assert await backend.set("lock", "second", nx=True) is None
+    assert await backend.mget(["lock"]) == [b"first"]
+
+    # an expired key can be taken again
+    await asyncio.sleep(0.05)
+    assert await backend.set("lock", "second", nx=True)
+    assert await backend.mget(["lock"]) == [b"second"]
+
+
+#  Test for deleting a key only while it holds a value
+async def test_memory_backend_delete_if_equals() -> None:
+    backend = MemoryBackend(max_keys=10)
+    await backend.set("lock", "token")
+    assert await backend.delete_if_equals("lock", "other") == 0
+    assert await backend.exists("lock") == 1
+    assert await backend.delete_if_equals("lock", b"token") == 1
+    assert await backend.exists("lock") == 0
+    assert await backend.delete_if_equals("lock", "token") == 0
+
+
+#  Test for sets and their expiry
+async def test_memory_backend_sets() -> None:
+    backend = MemoryBackend(max_keys=10)
+    assert await backend.sadd("tag", "a", "b") == 2
+    assert await backend.sadd("tag", "b", "c") == 1
+    assert await backend.smembers("tag") == {b"a", b"b", b"c"}
+    # sets are not strings
+    assert await backend.mget(["tag"]) == [None]
+
+    assert await backend.expire("tag", 0)
+    assert await backend.smembers("tag") == set()
+    assert not await backend.expire("missing", 10)
+
+
+#  Test for pipelines running every command in order
+async def test_memory_backend_pipeline() -> None:
+    backend = MemoryBackend(max_keys=10)
+    results = await backend.pipeline(
+        [("set", "a", "1"), ("sadd", "tag", "a"), ("delete", "a", "b"), ("mget", ["a"])]
+    )
+    assert results == [True, 1, 1, [None]]
+
+
+#  Test for delivering published messages to the subscribers of a channel
+async def test_memory_backend_publish_subscribe() -> None:
+    backend = MemoryBackend(max_keys=10)
+    assert await backend.publish("channel", "nobody listens") == 0
+    async with backend.subscribe("channel") as subscription, backend.subscribe(
+        "other"
+    ) as other:
+        assert await backend.publish("channel", "message") == 1
+        assert await subscription.get_message(timeout=1) == b"message"
+        assert await subscription.get_message(timeout=0.01) is None
+        assert await other.get_message(timeout=0.01) is None
+    assert await backend.publish("channel", "message") == 0
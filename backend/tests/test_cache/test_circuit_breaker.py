@@ -0,0 +1,49 @@
+import pytest
+
+from backend.app.cache.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(
+        "backend.app.cache.circuit_breaker.time.monotonic", lambda: now[0]
+    )
+    return now
+
+
+#  Test for opening after consecutive failures only
+def test_circuit_breaker_opens(clock) -> None:
+    breaker = CircuitBreaker("redis", failure_threshold=3, reset_seconds=5)
+    breaker.record_failure()
+    breaker.record_failure()
+    # a success resets the count
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+#  Test for a single trial call per reset_seconds while half-open
+def test_circuit_breaker_half_open(clock) -> None:
+    breaker = CircuitBreaker("redis", failure_threshold=1, reset_seconds=5)
+    breaker.record_failure()
+    clock[0] += 5
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # a failing trial keeps it open for another reset_seconds
+    breaker.record_failure()
+    clock[0] += 4
+    assert not breaker.allow()
+    clock[0] += 1
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
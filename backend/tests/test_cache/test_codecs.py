@@ -0,0 +1,59 @@
+import json
+import sys
+from datetime import datetime
+
+import pytest
+
+from backend.app.cache.codecs import COMPRESSORS, SERIALIZERS, CacheCodec
+from backend.app.core.settings.app import CACHE_CODECS, CACHE_COMPRESSIONS
+
+VALUE = {"name": "Book One", "tags": ["a", "b"] * 50, "price": 10.5}
+
+
+#  Test for round trips with and without compression
+def test_codec_round_trip() -> None:
+    codec = CacheCodec("json", compression="zlib", compression_threshold=100)
+    small, large = {"name": "Book"}, VALUE
+    # header: json serializer in the high nibble, zlib in the low one when compressed
+    assert codec.encode(small)[0] == 0x10
+    assert codec.encode(large)[0] == 0x11
+    assert codec.decode(codec.encode(small)) == small
+    assert codec.decode(codec.encode(large)) == large
+    assert codec.decode(codec.encode({"at": datetime(2024, 1, 2)})) == {
+        "at": "2024-01-02T00:00:00"
+    }
+
+
+#  Test for reading values written with another codec configuration
+def test_codec_reads_other_versions() -> None:
+    plain = CacheCodec("json")
+    compressed = CacheCodec("json", compression="zlib")
+    assert plain.decode(compressed.encode(VALUE)) == VALUE
+    assert compressed.decode(plain.encode(VALUE)) == VALUE
+
+
+#  Test for rejecting values without a known header
+def test_codec_rejects_legacy_values() -> None:
+    codec = CacheCodec("json")
+    # values cached before the header existed were plain JSON
+    with pytest.raises(ValueError):
+        codec.decode(json.dumps(VALUE).encode())
+    with pytest.raises(ValueError):
+        codec.decode(b"")
+    # known header, corrupt payload
+    with pytest.raises(ValueError):
+        codec.decode(bytes((0x11,)) + b"not zlib")
+
+
+#  Test for the codec names the settings accept
+def test_codec_names_match_settings() -> None:
+    assert set(CACHE_CODECS) == set(SERIALIZERS)
+    assert set(CACHE_COMPRESSIONS) == set(COMPRESSORS)
+
+
+#  Test for failing when the codec is built without its package
+def test_codec_not_installed(monkeypatch) -> None:
+    # a None entry makes the import fail as if the package was missing
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    with pytest.raises(ImportError, match="cache extra"):
+        CacheCodec("orjson")
@@ -0,0 +1,49 @@
+import time
+
+from backend.app.cache.local import LocalCache
+
+
+#  Test for evicting the least recently used entries beyond max_entries
+def test_local_cache_entry_eviction() -> None:
+    cache = LocalCache(max_entries=2, max_bytes=1000, ttl=60)
+    cache.set("a", 1, size=10)
+    cache.set("b", 2, size=10)
+    # reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == 1
+    cache.set("c", 3, size=10)
+    assert [cache.get(key) for key in ("a", "b", "c")] == [1, None, 3]
+    assert cache.status_dict() == {
+        "hits": 3,
+        "misses": 1,
+        "hit_ratio": 0.75,
+        "entries": 2,
+        "bytes": 20,
+    }
+
+
+#  Test for evicting entries beyond max_bytes
+def test_local_cache_byte_eviction() -> None:
+    cache = LocalCache(max_entries=10, max_bytes=100, ttl=60)
+    cache.set("a", 1, size=60)
+    cache.set("b", 2, size=30)
+    cache.set("c", 3, size=30)
+    assert cache.get("a") is None
+    assert cache.size == 60
+
+    # values larger than the cache are not stored, replacing a key frees its size
+    cache.set("b", 4, size=200)
+    assert cache.get("b") is None
+    assert cache.size == 30
+
+    cache.delete(["c", "missing"])
+    assert cache.size == 0
+
+
+#  Test for entries expiring after ttl
+def test_local_cache_expiry() -> None:
+    cache = LocalCache(max_entries=10, max_bytes=100, ttl=0.01)
+    cache.set("a", 1, size=10)
+    assert cache.get("a") == 1
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.size == 0
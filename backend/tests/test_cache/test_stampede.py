@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.app.cache.stampede import SingleFlight, refresh_early
+
+
+#  Test for sharing one call between concurrent callers of a key
+async def test_single_flight_shares_result() -> None:
+    single_flight = SingleFlight()
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return f"value of {key}"
+
+    results = await asyncio.gather(
+        *(single_flight.run("a", lambda: load("a")) for _ in range(10)),
+        single_flight.run("b", lambda: load("b")),
+    )
+    assert results == ["value of a"] * 10 + ["value of b"]
+    assert sorted(calls) == ["a", "b"]
+    assert not single_flight.in_flight("a")
+
+    # a finished call is not reused
+    await single_flight.run("a", lambda: load("a"))
+    assert calls.count("a") == 2
+
+
+#  Test for sharing the exception of a call
+async def test_single_flight_shares_exception() -> None:
+    single_flight = SingleFlight()
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise LookupError("missing")
+
+    results = await asyncio.gather(
+        *(single_flight.run("a", fail) for _ in range(3)), return_exceptions=True
+    )
+    assert calls == 1
+    assert all(isinstance(result, LookupError) for result in results)
+
+
+#  Test for a waiting caller taking over when the first call is cancelled
+async def test_single_flight_cancelled_call() -> None:
+    single_flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "value"
+
+    first = asyncio.create_task(single_flight.run("a", slow))
+    await started.wait()
+    waiter = asyncio.create_task(single_flight.run("a", fast))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await waiter == "value"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+#  Test for the early refresh probability growing towards the expiry
+def test_refresh_early() -> None:
+    now = time.time()
+    assert refresh_early(delta=1.0, expires_at=now - 1, beta=1.0)
+    assert not refresh_early(delta=0.001, expires_at=now + 3600, beta=1.0)
+    # without a load time nothing is refreshed before the expiry
+    assert not refresh_early(delta=0.0, expires_at=now + 1, beta=1.0)
+
+    near = sum(refresh_early(1.0, now + 0.5, 1.0) for _ in range(1000))
+    far = sum(refresh_early(1.0, now + 5, 1.0) for _ in range(1000))
+    assert near > far
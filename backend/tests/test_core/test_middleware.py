@@ -0,0 +1,103 @@
+import asyncio
+
+from backend.app.core.middleware import CancelOnDisconnectMiddleware
+
+SCOPE = {"type": "http", "method": "POST", "path": "/"}
+DISCONNECT = {"type": "http.disconnect"}
+
+
+class FakeClient:
+    """
+    ASGI receive / send of a client sending `chunks` of body, then disconnecting once
+    `disconnect` is set
+    """
+
+    def __init__(self, chunks) -> None:
+        self.pending = [
+            {
+                "type": "http.request",
+                "body": chunk,
+                "more_body": index < len(chunks) - 1,
+            }
+            for index, chunk in enumerate(chunks)
+        ]
+        self.received = 0
+        self.disconnect = asyncio.Event()
+        self.sent = []
+
+    async def receive(self):
+        if self.pending:
+            self.received += 1
+            return self.pending.pop(0)
+        await self.disconnect.wait()
+        return DISCONNECT
+
+    async def send(self, message) -> None:
+        self.sent.append(message)
+
+
+async def _respond(send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"done"})
+
+
+#  Test for cancelling the handler when the client disconnects
+async def test_cancel_on_disconnect() -> None:
+    client = FakeClient([b""])
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def app(scope, receive, send):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    middleware = asyncio.create_task(
+        CancelOnDisconnectMiddleware(app)(SCOPE, client.receive, client.send)
+    )
+    await started.wait()
+    client.disconnect.set()
+    await asyncio.wait_for(middleware, 1)
+    assert cancelled.is_set()
+    assert not client.sent
+
+
+#  Test for passing the body on without reading ahead of the handler
+async def test_cancel_on_disconnect_body() -> None:
+    client = FakeClient([b"a", b"b", b"c"])
+    read_ahead = []
+
+    async def app(scope, receive, send):
+        body = b""
+        while True:
+            await asyncio.sleep(0.01)
+            # chunks the middleware took from the client but the handler did not read yet
+            read_ahead.append(client.received - len(body))
+            message = await receive()
+            body += message["body"]
+            if not message["more_body"]:
+                break
+        assert body == b"abc"
+        await _respond(send)
+
+    await CancelOnDisconnectMiddleware(app)(SCOPE, client.receive, client.send)
+    assert max(read_ahead) <= 1
+    assert client.sent[-1]["body"] == b"done"
+
+
+#  Test for leaving the handler alone once the response is complete
+async def test_disconnect_after_response() -> None:
+    client = FakeClient([b""])
+    finished = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await _respond(send)
+        # e.g. a background task, running after the response
+        client.disconnect.set()
+        await asyncio.sleep(0.01)
+        finished.set()
+
+    await CancelOnDisconnectMiddleware(app)(SCOPE, client.receive, client.send)
+    assert finished.is_set()
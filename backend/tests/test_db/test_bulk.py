@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import func, select
+
+from backend.app.core.config import settings
+from backend.app.db.bulk import copy_to_db
+from backend.app.models.users.user import User
+
+
+def _users(count: int):
+    for index in range(count):
+        yield User(
+            first_name="Copy",
+            last_name=str(index),
+            email=f"copy.{index}@hpe.com",
+            password_hash=b"hash",
+        )
+
+
+@pytest.mark.skipif(
+    not settings.database_url.startswith("postgresql+asyncpg"),
+    reason="COPY is only used with the asyncpg driver",
+)
+#  Test for loading rows with COPY in chunks
+async def test_copy_to_db(db_session) -> None:
+    result = await copy_to_db(db_session, User, _users(5), chunk_size=2)
+    assert (result.rows, result.chunks) == (5, 3)
+
+    count = await db_session.scalar(
+        select(func.count()).select_from(User).where(User.first_name == "Copy")
+    )
+    assert count == 5
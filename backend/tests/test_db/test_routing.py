@@ -0,0 +1,69 @@
+from sqlalchemy import create_engine, insert, select
+
+from backend.app.db.routing import (
+    PIN_PRIMARY_KEY,
+    READ_REPLICA_OPTION,
+    ReplicaSet,
+    RoutingSession,
+    replica_ejected,
+)
+from backend.app.models.books.book import Book  # noqa
+from backend.app.models.users.user import User
+
+# engines connect lazily, none of these tests opens a connection
+PRIMARY_URL = "postgresql+psycopg2://primary/db"
+REPLICA_URL = "postgresql+psycopg2://replica/db"
+
+
+def _routing_session() -> RoutingSession:
+    replica = create_engine(REPLICA_URL)
+    return RoutingSession(
+        bind=create_engine(PRIMARY_URL), replicas=ReplicaSet([replica], 30)
+    )
+
+
+#  Test for routing reads to the replica until the session writes
+def test_routing_session_pins_after_insert_returning() -> None:
+    session = _routing_session()
+    read = select(User).execution_options(**{READ_REPLICA_OPTION: True})
+    assert session.get_bind(clause=read).url.host == "replica"
+
+    table = User.__table__
+    insert_returning = select(User).from_statement(
+        insert(table).values(email="a@b.c").returning(*table.columns)
+    )
+    assert session.get_bind(clause=insert_returning).url.host == "primary"
+    assert session.info.get(PIN_PRIMARY_KEY)
+    assert session.get_bind(clause=read).url.host == "primary"
+
+
+#  Test for round-robin over the replicas, skipping ejected ones until they are due again
+def test_replica_set_choose_and_eject(monkeypatch) -> None:
+    now = 1000.0
+    monkeypatch.setattr("backend.app.db.routing.time.monotonic", lambda: now)
+    first, second = create_engine(REPLICA_URL), create_engine(REPLICA_URL)
+    replicas = ReplicaSet([first, second], ejection_seconds=30)
+    assert [replicas.choose() for _ in range(4)] == [first, second, first, second]
+
+    replicas.eject(first)
+    assert replicas.is_ejected(first)
+    assert [replicas.choose() for _ in range(3)] == [second] * 3
+    replicas.eject(second)
+    assert replicas.choose() is None
+
+    now += 30
+    assert not replicas.is_ejected(first)
+    assert {replicas.choose() for _ in range(2)} == {first, second}
+
+
+#  Test for telling a lost replica apart from errors of the statement itself
+def test_replica_ejected() -> None:
+    session = _routing_session()
+    # no replica serves the session yet
+    assert not replica_ejected(session)
+
+    read = select(User).execution_options(**{READ_REPLICA_OPTION: True})
+    replica = session.get_bind(clause=read)
+    assert not replica_ejected(session)
+    session.replicas.eject(replica)
+    assert replica_ejected(session)
@@ -11,4 +11,6 @@ setup(
     description="Boilerplate full-stack FastAPI application",
     packages=find_packages(),
     install_requires=requirements,
+    # optional cache codecs, see CACHE_CODECS and CACHE_COMPRESSIONS of the app settings
+    extras_require={"cache": ["orjson", "msgpack", "zstandard", "lz4"]},
 )